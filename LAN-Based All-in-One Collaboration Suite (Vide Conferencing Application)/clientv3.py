@@ -2,8 +2,6 @@ import socket
 import threading
 import struct
 import time
-import json
-import base64
 import math
 from enum import Enum
 import tkinter as tk
@@ -12,20 +10,47 @@ from PIL import ImageGrab, Image, ImageTk
 import cv2
 import pyaudio
 import numpy as np
-import io
+import msgpack
 import sys
 import os
 import platform
+import ctypes
+import collections
+import asyncio
+import concurrent.futures
+import queue
+import tempfile
+import shutil
+import glob
+import logging
+from fractions import Fraction
 
 # Suppress OpenCV warnings for cleaner output (optional)
 # Uncomment the next two lines to hide camera detection warnings:
 # os.environ['OPENCV_LOG_LEVEL'] = 'ERROR'
 # cv2.setLogLevel(0)
 
+# Per-frame GUI diagnostics go through here at DEBUG so they cost nothing by default
+log = logging.getLogger('meetingui')
+
 # Detect OS for camera backend
 IS_WINDOWS = platform.system() == 'Windows'
 IS_LINUX = platform.system() == 'Linux'
 
+# Batched UDP I/O via sendmmsg(2)/recvmmsg(2), Linux only
+HAS_SENDMMSG = False
+HAS_RECVMMSG = False
+MSG_WAITFORONE = 0x10000
+if IS_LINUX:
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.sendmmsg.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int)
+        HAS_SENDMMSG = True
+        _libc.recvmmsg.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p)
+        HAS_RECVMMSG = True
+    except (OSError, AttributeError):
+        pass
+
 # Virtual camera fallback
 try:
     from virtual_camera import VirtualCamera
@@ -33,6 +58,49 @@ try:
 except ImportError:
     HAS_VIRTUAL_CAMERA = False
 
+# H.264 video via FFmpeg. Listed as a requirement, since receivers without it can't
+# decode H.264 senders; when missing we still run, sending JPEG and warning on drops.
+try:
+    import av
+    # Older PyAV releases take the picture type as a string
+    PICT_TYPE_I = getattr(getattr(av.video.frame, 'PictureType', None), 'I', 'I')
+    HAS_AV = True
+except ImportError:
+    HAS_AV = False
+
+# Opus speech codec. Listed as a requirement, since receivers without it hear nothing
+# from Opus senders; when missing we still run, sending raw PCM and warning on drops.
+# opuslib raises a plain Exception when the native libopus is missing.
+try:
+    import opuslib
+    HAS_OPUS = True
+except Exception:
+    HAS_OPUS = False
+
+# Callback-driven microphone capture (optional, falls back to a PyAudio read loop).
+# sounddevice raises OSError when the PortAudio library can't be found.
+try:
+    import sounddevice
+    HAS_SOUNDDEVICE = True
+except Exception:
+    HAS_SOUNDDEVICE = False
+
+# Fast framebuffer capture (optional, falls back to PIL ImageGrab)
+try:
+    import mss
+    HAS_MSS = True
+except ImportError:
+    HAS_MSS = False
+
+# libjpeg-turbo SIMD codec (optional, falls back to OpenCV's JPEG codec).
+# TurboJPEG() raises when the native library can't be found.
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420, TJFLAG_FASTDCT, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+    HAS_TURBOJPEG = True
+except Exception:
+    HAS_TURBOJPEG = False
+
 def list_audio_devices(p):
     """Print available audio devices for debugging/selection."""
     try:
@@ -68,11 +136,351 @@ class MessageType(Enum):
     VIDEO_STREAM = 10
     AUDIO_STREAM = 11
     UDP_REGISTER = 12
+    FILE_ABORT = 13  # sender could not finish a file; receivers drop it
+
+# Messages whose payload is a raw binary frame rather than a msgpack map
+BINARY_MESSAGES = {MessageType.FILE_CHUNK, MessageType.SCREEN_IMAGE}
+# File messages that touch the download spool on the TCP thread
+_SPOOL_MESSAGES = frozenset((MessageType.FILE_NOTIFY, MessageType.FILE_CHUNK, MessageType.FILE_ABORT))
 
 TCP_PORT = 5000
 UDP_PORT = 5001
 BUFFER_SIZE = 65536
-CHUNK_SIZE = 1024
+TCP_RECV_SIZE = 256 * 1024
+SOCK_BUF_SIZE = 2 << 20       # 2 MB kernel buffers for TCP and UDP sends
+UDP_RCV_BUF_SIZE = 4 << 20    # extra headroom for UDP, which can't recover drops
+TOS_EF = 0xb8                 # DSCP 46 (expedited forwarding) for media
+AUDIO_RATE = 48000
+CHUNK_SIZE = 960  # 20 ms at 48 kHz, one Opus frame
+
+# First byte of every AUDIO_STREAM payload says how the rest is encoded
+AUDIO_PCM = 0    # raw int16 mono samples
+AUDIO_OPUS = 1   # sequence of [2-byte length][opus frame]
+OPUS_BITRATE = 32000
+OPUS_FRAMES_PER_PACKET = 2  # 40 ms of audio per datagram
+SPEAKER_UPDATE_INTERVAL = 0.1  # seconds between 'is speaking' GUI updates per sender
+SPEAKER_HOLD = 2.0  # seconds a sender stays 'speaking' after their last audio
+
+UDP_BATCH_SIZE = 16   # datagrams per sendmmsg call
+UDP_QUEUE_LIMIT = 64  # outbound datagrams kept per stream before the oldest are dropped
+AUDIO_PLAYBACK_LIMIT = 5  # decoded packets waiting for the speaker before the oldest are dropped
+
+_HDR = struct.Struct('!BI')  # message type, payload length
+_U32 = struct.Struct('!I')
+_U16 = struct.Struct('!H')  # Opus frame lengths and SCREEN_IMAGE sender name lengths
+
+FILE_CHUNK_SIZE = 65536
+FILE_PROGRESS_INTERVAL = 0.1  # seconds between upload progress GUI updates
+FILE_QUEUE_CHUNKS = 32  # chunks read ahead of the socket (2 MB at 64 KB chunks)
+_CHUNK_HDR = struct.Struct('!IH')  # chunk_id, filename length
+
+
+def pack_binary_chunk(filename, chunk_id, chunk_bytes):
+    """Build a FILE_CHUNK payload: [chunk_id][name_len][filename][raw bytes]."""
+    name = filename.encode()
+    return _CHUNK_HDR.pack(chunk_id, len(name)) + name + chunk_bytes
+
+
+def unpack_binary_chunk(payload):
+    chunk_id, name_len = _CHUNK_HDR.unpack_from(payload)
+    start = _CHUNK_HDR.size
+    return {
+        'filename': payload[start:start + name_len].decode(),
+        'chunk_id': chunk_id,
+        'data': payload[start + name_len:],
+    }
+
+
+def unpack_screen_image(payload):
+    """Split a relayed SCREEN_IMAGE: [user_len][user][encoded frame]."""
+    (name_len,) = _U16.unpack_from(payload)
+    start = _U16.size
+    return {
+        'user': payload[start:start + name_len].decode(),
+        'image': payload[start + name_len:],
+    }
+
+def open_spool_file(filename, size):
+    """Create a temp file to receive `filename` into. Returns (file object, path)."""
+    fd, path = tempfile.mkstemp(prefix='lan-suite-', suffix=os.path.splitext(filename)[1])
+    fh = os.fdopen(fd, 'wb+')
+    if size:
+        fh.truncate(size)  # reserve the length up front; chunks land at their offsets
+    return fh, path
+
+
+def write_at(fh, data, offset):
+    """Write `data` at `offset` in `fh` without disturbing other writers' positions."""
+    if hasattr(os, 'pwrite'):
+        os.pwrite(fh.fileno(), data, offset)
+    else:
+        # Windows has no pwrite; fall back to seek + write
+        fh.seek(offset)
+        fh.write(data)
+
+
+def recv_exact(sock, n):
+    """Read exactly `n` bytes from `sock`; raises ConnectionError if it closes first."""
+    buf = bytearray(n)
+    with memoryview(buf) as view:
+        got = 0
+        while got < n:
+            r = sock.recv_into(view[got:])
+            if not r:
+                raise ConnectionError("server closed the connection")
+            got += r
+    return bytes(buf)
+
+VIDEO_WIDTH = 320
+VIDEO_HEIGHT = 240
+VIDEO_FPS = 12
+VIDEO_RENDER_INTERVAL = 1 / 30  # minimum seconds between repaints of one tile
+SPEAKER_VIEW_SIZE = (960, 720)  # speaker view fits frames into this box, never upscaling
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+SCREEN_FPS = 8
+MAX_CHAT_LINES = 2000  # older chat lines are dropped from the top
+CAMERA_PROBE_TIMEOUT = 1.5  # seconds detect_cameras waits for slow devices
+JPEG_SOI = b'\xff\xd8'  # JPEG payloads start with this marker, H.264 ones don't
+# Gallery columns by tile count: ceil(sqrt(n)), capped at 5 like Zoom
+COLS_FOR_COUNT = tuple(min(5, math.ceil(math.sqrt(n))) for n in range(64))
+# Participant list status by (video, mic)
+STATUS_STRINGS = {
+    (True, True): '📹 🎤',
+    (True, False): '📹 🔇',
+    (False, True): '🎤',
+    (False, False): '🔇',
+}
+# Control bar button labels
+MIC_ON_TEXT = "🎤\nMute"
+MIC_OFF_TEXT = "🎤\nUnmute"
+VIDEO_ON_TEXT = "📹\nStop Video"
+VIDEO_OFF_TEXT = "📹\nStart Video"
+SHARE_ON_TEXT = "🖥️\nStop Sharing"
+SHARE_OFF_TEXT = "🖥️\nShare Screen"
+
+
+class _SockaddrIn(ctypes.Structure):
+    _fields_ = [('sin_family', ctypes.c_ushort), ('sin_port', ctypes.c_uint16),
+                ('sin_addr', ctypes.c_uint8 * 4), ('sin_zero', ctypes.c_uint8 * 8)]
+
+
+class _Iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+
+class _Msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_Iovec)), ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class _Mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _Msghdr), ('msg_len', ctypes.c_uint)]
+
+
+class SendmmsgBatch:
+    """Preallocated mmsghdr array that sends up to `size` datagrams to one address per syscall.
+
+    Each datagram is a sequence of up to `parts` bytes objects that the kernel
+    gathers into one packet, so headers never get copied onto their payloads.
+    """
+
+    def __init__(self, addr, size=UDP_BATCH_SIZE, parts=2):
+        ip, port = addr
+        self.size = size
+        self.parts = parts
+        self._addr = _SockaddrIn(socket.AF_INET, socket.htons(port),
+                                 (ctypes.c_uint8 * 4)(*socket.inet_aton(ip)))
+        self._iov = (_Iovec * (size * parts))()
+        self._msgs = (_Mmsghdr * size)()
+        for i in range(size):
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._addr)
+            hdr.msg_namelen = ctypes.sizeof(self._addr)
+            hdr.msg_iov = ctypes.pointer(self._iov[i * parts])
+
+    def send(self, fd, datagrams):
+        """Send a list of at most `size` datagrams, retrying on partial sends."""
+        for i, chunks in enumerate(datagrams):
+            base = i * self.parts
+            for j, data in enumerate(chunks):
+                # c_char_p points at the bytes object's own buffer, no copy
+                self._iov[base + j].iov_base = ctypes.cast(ctypes.c_char_p(data), ctypes.c_void_p)
+                self._iov[base + j].iov_len = len(data)
+            self._msgs[i].msg_hdr.msg_iovlen = len(chunks)
+        sent, count = 0, len(datagrams)
+        while sent < count:
+            n = _libc.sendmmsg(fd, ctypes.byref(self._msgs, sent * ctypes.sizeof(_Mmsghdr)), count - sent, 0)
+            if n < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+            sent += n
+
+
+class MediaProtocol(asyncio.DatagramProtocol):
+    """Receives media datagrams on the client's asyncio I/O loop."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def datagram_received(self, data, addr):
+        self.client.handle_udp_datagram(data)
+
+    def error_received(self, exc):
+        if self.client.running:
+            print(f"UDP receive error: {exc}")
+
+
+class RecvmmsgBatch:
+    """Preallocated buffers for receiving up to `size` datagrams per recvmmsg call."""
+
+    def __init__(self, size=UDP_BATCH_SIZE, bufsize=BUFFER_SIZE):
+        self.size = size
+        self._buf = bytearray(size * bufsize)
+        self._view = memoryview(self._buf)
+        self._bufsize = bufsize
+        self._iov = (_Iovec * size)()
+        self._msgs = (_Mmsghdr * size)()
+        base = ctypes.addressof((ctypes.c_char * len(self._buf)).from_buffer(self._buf))
+        for i in range(size):
+            self._iov[i].iov_base = base + i * bufsize
+            self._iov[i].iov_len = bufsize
+            self._msgs[i].msg_hdr.msg_iov = ctypes.pointer(self._iov[i])
+            self._msgs[i].msg_hdr.msg_iovlen = 1
+
+    def recv(self, fd):
+        """Return memoryviews of every datagram queued on the socket (at least one).
+
+        On a non-blocking socket this raises BlockingIOError when nothing is
+        queued. The views are only valid until the next call.
+        """
+        n = _libc.recvmmsg(fd, self._msgs, self.size, MSG_WAITFORONE, None)
+        if n < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return [self._view[i * self._bufsize:i * self._bufsize + self._msgs[i].msg_len] for i in range(n)]
+
+
+def encode_jpeg(bgr, quality):
+    """JPEG-encode a BGR frame, using libjpeg-turbo's fast DCT when available."""
+    if HAS_TURBOJPEG:
+        return _turbojpeg.encode(bgr, quality=quality, jpeg_subsample=TJSAMP_420, flags=TJFLAG_FASTDCT)
+    _, buffer = cv2.imencode('.jpg', bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+
+class VideoEncoder:
+    """Low-latency H.264 encoder, preferring NVENC, then Intel QSV, then x264."""
+
+    # (codec, codec-private options) in order of preference
+    CANDIDATES = (
+        ('h264_nvenc', {'preset': 'p1', 'tune': 'll', 'zerolatency': '1', 'delay': '0', 'rc': 'cbr'}),
+        ('h264_qsv', {'preset': 'veryfast', 'async_depth': '1'}),
+        ('libx264', {'preset': 'ultrafast', 'tune': 'zerolatency'}),
+    )
+    # Screen content is mostly static: spend more effort per frame, long GOP
+    SCREEN_CANDIDATES = (
+        ('h264_nvenc', {'preset': 'p4', 'tune': 'll', 'rc': 'vbr'}),
+        ('h264_qsv', {'preset': 'medium', 'async_depth': '1'}),
+        ('libx264', {'preset': 'veryfast', 'tune': 'stillimage,zerolatency'}),
+    )
+
+    def __init__(self, width, height, fps, bit_rate, gop, candidates=None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.bit_rate = bit_rate
+        self.gop = gop
+        self.candidates = candidates or self.CANDIDATES
+        self.ctx = None
+        self.codec_name = None
+        self._pts = 0
+        self._force_keyframe = False
+
+    def open(self):
+        """Open the first encoder that initialises. Returns False if none do."""
+        for name, options in self.candidates:
+            try:
+                ctx = av.CodecContext.create(name, 'w')
+                ctx.width = self.width
+                ctx.height = self.height
+                ctx.pix_fmt = 'nv12'
+                ctx.bit_rate = self.bit_rate
+                ctx.time_base = Fraction(1, self.fps)
+                ctx.framerate = Fraction(self.fps, 1)
+                ctx.gop_size = self.gop  # periodic IDR so receivers recover from UDP loss
+                ctx.max_b_frames = 0
+                # Cap the VBV buffer so keyframes stay bounded (camera ones must fit in a datagram)
+                ctx.options = dict(options, maxrate=str(self.bit_rate), bufsize=str(self.bit_rate // 2))
+                ctx.open()
+            except Exception as e:
+                print(f"Encoder {name} unavailable: {e}")
+                continue
+            self.ctx = ctx
+            self.codec_name = name
+            print(f"Video encoder: {name}")
+            return True
+        return False
+
+    def encode(self, image, format='bgr24'):
+        """Encode one frame (any size) and return the H.264 packets as bytes.
+
+        `image` is an HxWx3 BGR array, or HxWx2 packed YUYV with format='yuyv422'.
+        """
+        frame = av.VideoFrame.from_ndarray(image, format=format)
+        # One swscale pass does both the downscale and the conversion to NV12
+        frame = frame.reformat(width=self.width, height=self.height, format='nv12')
+        frame.pts = self._pts
+        self._pts += 1
+        if self._force_keyframe:
+            self._force_keyframe = False
+            frame.pict_type = PICT_TYPE_I
+        return [bytes(packet) for packet in self.ctx.encode(frame)]
+
+    def request_keyframe(self):
+        """Make the next frame an IDR so a viewer that just joined can start decoding."""
+        self._force_keyframe = True
+
+
+class VideoDecoder:
+    """Decodes one sender's video stream, accepting both H.264 and JPEG payloads."""
+
+    def __init__(self):
+        self.ctx = None
+        self._rgb = None
+        self.missing_codec = False  # set once an H.264 frame had to be dropped
+
+    def decode(self, payload):
+        """Return the decoded RGB frame, or None if the payload produced no picture.
+
+        JPEG frames are decoded into a buffer owned by the decoder, so the result
+        is only valid until the next call.
+        """
+        if payload[:2] == JPEG_SOI:
+            return self._decode_jpeg(payload)
+        if not HAS_AV:
+            if not self.missing_codec:
+                log.warning("Dropping H.264 video: PyAV is not installed (pip install av)")
+                self.missing_codec = True
+            return None
+        if self.ctx is None:
+            self.ctx = av.CodecContext.create('h264', 'r')
+        frame = None
+        for frame in self.ctx.decode(av.Packet(payload)):
+            pass
+        return np.ascontiguousarray(frame.to_ndarray(format='rgb24')) if frame is not None else None
+
+    def _decode_jpeg(self, payload):
+        if HAS_TURBOJPEG:
+            width, height = _turbojpeg.decode_header(payload)[:2]
+            if self._rgb is None or self._rgb.shape[:2] != (height, width):
+                self._rgb = np.empty((height, width, 3), np.uint8)
+            return _turbojpeg.decode(payload, pixel_format=TJPF_RGB, flags=TJFLAG_FASTDCT, dst=self._rgb)
+        frame = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) if frame is not None else None
+
 
 class Client:
     def __init__(self, server_ip, username):
@@ -80,18 +488,48 @@ class Client:
         self.server_ip = server_ip
         self.running = True
         
-        # TCP connection
+        # TCP connection (buffers set before connect so the window scale is negotiated)
         self.tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.tcp_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF_SIZE)
+        self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF_SIZE)
         self.tcp_socket.connect((server_ip, TCP_PORT))
-        self.tcp_socket.send(username.encode())
+        # Chat, screen share and file threads all send; sendall must not interleave frames
+        self._tcp_send_lock = threading.Lock()
+        self.tcp_socket.sendall(username.encode())
         
         # Get confirmed username (in case of duplicates)
-        self.username = self.tcp_socket.recv(1024).decode()
+        # (length-prefixed, so it never merges with the messages queued after it)
+        name_len, = _U32.unpack(recv_exact(self.tcp_socket, _U32.size))
+        self.username = recv_exact(self.tcp_socket, name_len).decode()
         
         # UDP socket
         self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF_SIZE)
+        self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RCV_BUF_SIZE)
+        try:
+            # Let switches prioritise voice/video; not every OS allows setting it
+            self.udp_socket.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, TOS_EF)
+        except OSError:
+            pass
         self.udp_socket.bind(('', 0))  # Bind to any available port
         udp_port = self.udp_socket.getsockname()[1]
+        self.udp_server_addr = (socket.gethostbyname(server_ip), UDP_PORT)
+        
+        # Media I/O runs on one asyncio loop; capture threads hand datagrams to
+        # it through these queues, flushed in batches by _flush_udp (audio first)
+        self.loop = asyncio.new_event_loop()
+        self.udp_transport = None
+        self._send_batch = None
+        self._audio_q = collections.deque(maxlen=UDP_QUEUE_LIMIT)
+        self._video_q = collections.deque(maxlen=UDP_QUEUE_LIMIT)
+        self._flush_scheduled = False
+        # Speaker writes block for a whole buffer, so keep them off the loop. The
+        # queue is bounded: when playback falls behind the oldest audio is dropped
+        # rather than letting latency grow for the rest of the call
+        self._playback_q = collections.deque(maxlen=AUDIO_PLAYBACK_LIMIT)
+        self._playback_ready = threading.Event()
+        threading.Thread(target=self.audio_playback_loop, daemon=True).start()
         
         # Register UDP port with server
         self.send_tcp(MessageType.UDP_REGISTER, {'port': udp_port})
@@ -102,6 +540,12 @@ class Client:
         self.audio = None
         self.input_stream = None
         self.output_stream = None
+        self.opus_decoders = {}
+        self._opus_warned = False
+        self._speaker_seen = {}  # sender -> monotonic time of the last speaker update
+        self.video_encoder = None
+        self.screen_encoder = None
+        self._resize_dst = np.empty((VIDEO_HEIGHT, VIDEO_WIDTH, 3), np.uint8)
         self.is_sharing = False
         
         # Create GUI FIRST before starting network threads
@@ -109,7 +553,7 @@ class Client:
         
         # Now start network threads (after GUI exists)
         threading.Thread(target=self.handle_tcp_messages, daemon=True).start()
-        threading.Thread(target=self.handle_udp_receives, daemon=True).start()
+        threading.Thread(target=self.run_media_loop, daemon=True).start()
         
         # Set close handler and start GUI loop
         self.gui.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -122,11 +566,14 @@ class Client:
 
     def cleanup(self):
         try:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._playback_ready.set()
+            self.gui._decode_pool.shutdown(wait=False, cancel_futures=True)
+            for filename in list(self.gui.file_spools):
+                self.gui.discard_file_spool(filename)
             if self.cap:
                 self.cap.release()
-            if self.input_stream:
-                self.input_stream.stop_stream()
-                self.input_stream.close()
+            self.stop_audio_stream()
             if self.output_stream:
                 self.output_stream.stop_stream()
                 self.output_stream.close()
@@ -138,29 +585,46 @@ class Client:
             pass
 
     def handle_tcp_messages(self):
-        buffer = b''
+        scratch = bytearray(TCP_RECV_SIZE)
+        buffer = bytearray()
+        pos = 0  # start of the first unparsed message in buffer
         while self.running:
             try:
-                data = self.tcp_socket.recv(BUFFER_SIZE)
-                if not data:
+                n = self.tcp_socket.recv_into(scratch)
+                if not n:
                     break
                 
-                buffer += data
+                with memoryview(scratch) as view:
+                    buffer += view[:n]
                 
                 # Process complete messages
-                while len(buffer) >= 5:
-                    msg_type_byte = buffer[0]
-                    length = struct.unpack('!I', buffer[1:5])[0]
-                    
-                    if len(buffer) < 5 + length:
-                        break
-                    
-                    msg_type = MessageType(msg_type_byte)
-                    payload_bytes = buffer[5:5+length]
-                    buffer = buffer[5+length:]
-                    
+                messages = []
+                with memoryview(buffer) as view:
+                    while len(buffer) - pos >= 5:
+                        msg_type_byte, length = _HDR.unpack_from(buffer, pos)
+                        
+                        if len(buffer) - pos < 5 + length:
+                            break
+                        
+                        messages.append((msg_type_byte, bytes(view[pos + 5:pos + 5 + length])))
+                        pos += 5 + length
+                
+                # Compact only once the consumed prefix is the larger half
+                if pos > len(buffer) // 2:
+                    del buffer[:pos]
+                    pos = 0
+                
+                for msg_type_byte, payload_bytes in messages:
                     try:
-                        payload = json.loads(payload_bytes.decode())
+                        msg_type = MessageType(msg_type_byte)
+                        if msg_type == MessageType.FILE_CHUNK:
+                            payload = unpack_binary_chunk(payload_bytes)
+                        elif msg_type == MessageType.SCREEN_IMAGE:
+                            payload = unpack_screen_image(payload_bytes)
+                        else:
+                            payload = msgpack.unpackb(payload_bytes)
+                        if msg_type in _SPOOL_MESSAGES and hasattr(self, 'gui'):
+                            payload = self.gui.spool_file_message(msg_type, payload)
                         # Use after() to run GUI updates on main thread
                         if hasattr(self, 'gui') and self.gui:
                             self.gui.root.after(0, self.gui.handle_message, msg_type, payload)
@@ -172,60 +636,121 @@ class Client:
                     print(f"TCP receive error: {e}")
                 break
 
-    def handle_udp_receives(self):
-        while self.running:
+    def run_media_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.udp_socket.setblocking(False)
+        protocol = MediaProtocol(self)
+        if HAS_SENDMMSG:
+            self._send_batch = SendmmsgBatch(self.udp_server_addr)
+        if HAS_RECVMMSG:
+            # Drain the socket ourselves so one wake-up is one recvmmsg call
+            self.loop.add_reader(self.udp_socket.fileno(), self._drain_udp, protocol, RecvmmsgBatch())
+        else:
+            self.udp_transport, _ = self.loop.run_until_complete(
+                self.loop.create_datagram_endpoint(lambda: protocol, sock=self.udp_socket))
+        self.loop.run_forever()
+
+    def _drain_udp(self, protocol, batch):
+        fd = self.udp_socket.fileno()
+        while True:
             try:
-                data, addr = self.udp_socket.recvfrom(BUFFER_SIZE)
-                
-                if len(data) < 5:
-                    continue
-                
-                msg_type = MessageType(data[0])
-                length = struct.unpack('!I', data[1:5])[0]
-                full_payload = data[5:5+length]
-                
-                # Extract username from payload
-                username_len = struct.unpack('!I', full_payload[:4])[0]
-                sender_username = full_payload[4:4+username_len].decode()
-                payload = full_payload[4+username_len:]
-                
-                if msg_type == MessageType.VIDEO_STREAM:
-                    if hasattr(self, 'gui') and self.gui:
-                        self.gui.root.after(0, self.gui.update_video, payload, sender_username)
-                elif msg_type == MessageType.AUDIO_STREAM:
-                    # Play audio directly (not on GUI thread)
-                    self.play_audio(payload)
-                    # Update GUI to show who's speaking
+                datagrams = batch.recv(fd)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                protocol.error_received(e)
+                return
+            for datagram in datagrams:
+                protocol.datagram_received(datagram, None)
+            if len(datagrams) < batch.size:
+                return
+
+    def handle_udp_datagram(self, data):
+        try:
+            if len(data) < 9:
+                return
+            
+            # Parse in place: [type][length][username_len][username][payload]
+            mv = memoryview(data)
+            msg_type = MessageType(mv[0])
+            length = _U32.unpack_from(mv, 1)[0]
+            username_len = _U32.unpack_from(mv, 5)[0]
+            sender_username = bytes(mv[9:9+username_len]).decode('utf-8', 'replace')
+            payload = mv[9+username_len:5+length]
+            
+            if msg_type == MessageType.VIDEO_STREAM:
+                # Decoding happens on the GUI's worker pool, not the Tk thread
+                if hasattr(self, 'gui') and self.gui:
+                    self.gui.update_video(bytes(payload), sender_username)
+            elif msg_type == MessageType.AUDIO_STREAM:
+                # Play audio directly (not on GUI thread)
+                pcm = self.decode_audio(payload, sender_username)
+                if pcm:
+                    self._playback_q.append(pcm)
+                    self._playback_ready.set()
+                # Update GUI to show who's speaking, at most every SPEAKER_UPDATE_INTERVAL
+                now = time.monotonic()
+                if now - self._speaker_seen.get(sender_username, 0.0) >= SPEAKER_UPDATE_INTERVAL:
+                    self._speaker_seen[sender_username] = now
                     if hasattr(self, 'gui') and self.gui:
                         self.gui.root.after(0, self.gui.update_speaker, sender_username)
-                    
-            except Exception as e:
-                if self.running:
-                    print(f"UDP receive error: {e}")
+                
+        except Exception as e:
+            if self.running:
+                print(f"UDP receive error: {e}")
 
     def send_tcp(self, msg_type, payload):
+        """Send one framed message to the server; returns False if it could not be sent."""
         try:
             data = self.pack_message(msg_type, payload)
-            self.tcp_socket.send(data)
+            with self._tcp_send_lock:
+                self.tcp_socket.sendall(data)
+            return True
         except Exception as e:
             print(f"TCP send error: {e}")
+            return False
 
     def send_udp(self, msg_type, payload):
         try:
-            data = self.pack_udp_message(msg_type, payload)
-            self.udp_socket.sendto(data, (self.server_ip, UDP_PORT))
+            queue = self._audio_q if msg_type == MessageType.AUDIO_STREAM else self._video_q
+            # Header and payload stay separate; sendmmsg gathers them in the kernel
+            queue.append((_HDR.pack(msg_type.value, len(payload)), payload))
+            # One loop wake-up covers everything queued until the flush runs
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                self.loop.call_soon_threadsafe(self._flush_udp)
         except Exception as e:
             print(f"UDP send error: {e}")
 
+    def _flush_udp(self):
+        """Send all queued media datagrams; runs on the media loop."""
+        self._flush_scheduled = False
+        while self._audio_q or self._video_q:
+            datagrams = []
+            # Audio goes first so 20 ms frames never sit behind a video burst
+            for queue in (self._audio_q, self._video_q):
+                while queue and len(datagrams) < UDP_BATCH_SIZE:
+                    datagrams.append(queue.popleft())
+            try:
+                if self._send_batch:
+                    self._send_batch.send(self.udp_socket.fileno(), datagrams)
+                elif self.udp_transport:
+                    for header, payload in datagrams:
+                        self.udp_transport.sendto(header + payload, self.udp_server_addr)
+            except BlockingIOError:
+                pass  # socket buffer full: drop, like the network would
+            except OSError as e:
+                if self.running:
+                    print(f"UDP send error: {e}")
+
     def pack_message(self, msg_type, payload):
-        payload_bytes = json.dumps(payload).encode()
+        # Binary messages arrive pre-framed; everything else is a msgpack map
+        if isinstance(payload, bytes):
+            payload_bytes = payload
+        else:
+            payload_bytes = msgpack.packb(payload, use_bin_type=True)
         length = len(payload_bytes)
-        return struct.pack('!BI', msg_type.value, length) + payload_bytes
-
-    def pack_udp_message(self, msg_type, payload):
-        # For UDP, payload is raw bytes (video/audio data)
-        length = len(payload)
-        return struct.pack('!BI', msg_type.value, length) + payload
+        return _HDR.pack(msg_type.value, length) + payload_bytes
 
     def start_video_stream(self, device_index=None):
         if self.cap is None:
@@ -289,8 +814,9 @@ class Client:
                 
                 # Set camera properties for better compatibility (skip for virtual camera)
                 if not isinstance(self.cap, VirtualCamera if HAS_VIRTUAL_CAMERA else type(None)):
-                    self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                    self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+                    # Capture at the send size so most devices need no resize
+                    self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, VIDEO_WIDTH)
+                    self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, VIDEO_HEIGHT)
                     self.cap.set(cv2.CAP_PROP_FPS, 15)
                 
                 print("Camera initialized successfully")
@@ -309,9 +835,36 @@ class Client:
         max_failures = 10  # Stop after 10 consecutive failures
         frame_count = 0
         
+        encoder = None
+        if HAS_AV:
+            encoder = VideoEncoder(VIDEO_WIDTH, VIDEO_HEIGHT, VIDEO_FPS, bit_rate=400_000, gop=2 * VIDEO_FPS)
+            if not encoder.open():
+                print("No H.264 encoder available, falling back to JPEG")
+                encoder = None
+        self.video_encoder = encoder
+        # H.264 can take the camera's packed YUYV as-is, skipping OpenCV's BGR expansion
+        yuyv_size = self._enable_yuyv_capture() if encoder else None
+        
+        frame_interval = 1 / VIDEO_FPS  # ~12 FPS for stability
+        next_deadline = time.monotonic() + frame_interval
+        # VirtualCamera only offers read()
+        can_grab = hasattr(self.cap, 'grab') and hasattr(self.cap, 'retrieve')
+        captured = None  # handed back to OpenCV so it decodes into the same array
+        
         while self.running and self.cap and self.cap.isOpened():
             try:
-                ret, frame = self.cap.read()
+                if can_grab:
+                    # Pull frames off the driver until the deadline and only decode
+                    # the newest, so a stall never leaves us sending stale frames
+                    grabbed = self.cap.grab()
+                    while grabbed and time.monotonic() < next_deadline - 0.004:
+                        grabbed = self.cap.grab()
+                    ret, captured = self.cap.retrieve(captured) if grabbed else (False, captured)
+                else:
+                    time.sleep(max(0, next_deadline - time.monotonic()))
+                    ret, captured = self.cap.read()
+                frame = captured
+                next_deadline = max(next_deadline + frame_interval, time.monotonic())
                 
                 if not ret or frame is None:
                     consecutive_failures += 1
@@ -326,19 +879,29 @@ class Client:
                 
                 # Reset failure counter on success
                 consecutive_failures = 0
+                
+                if self._video_q:
+                    # The previous frame hasn't left yet: drop this one instead of queuing it
+                    continue
                 frame_count += 1
                 
-                # Compress to JPEG
-                frame = cv2.resize(frame, (320, 240))
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 65])
-                payload = buffer.tobytes()
-                self.send_udp(MessageType.VIDEO_STREAM, payload)
+                if yuyv_size:
+                    width, height = yuyv_size
+                    packets = encoder.encode(frame.reshape(height, width, 2), 'yuyv422')
+                elif encoder:
+                    packets = encoder.encode(frame)
+                else:
+                    # Compress to JPEG
+                    if frame.shape[1] != VIDEO_WIDTH or frame.shape[0] != VIDEO_HEIGHT:
+                        frame = cv2.resize(frame, (VIDEO_WIDTH, VIDEO_HEIGHT), dst=self._resize_dst,
+                                           interpolation=cv2.INTER_LINEAR)
+                    packets = [encode_jpeg(frame, 65)]
+                for payload in packets:
+                    self.send_udp(MessageType.VIDEO_STREAM, payload)
                 
                 # Debug output every 30 frames (~2-3 seconds)
                 if frame_count % 30 == 0:
-                    print(f"Sent {frame_count} video frames ({len(payload)} bytes)")
-                
-                time.sleep(1/12)  # ~12 FPS for stability
+                    print(f"Sent {frame_count} video frames ({sum(map(len, packets))} bytes)")
                 
             except Exception as e:
                 consecutive_failures += 1
@@ -348,6 +911,7 @@ class Client:
                 time.sleep(0.1)
         
         # Clean up
+        self.video_encoder = None
         if self.cap:
             self.cap.release()
             self.cap = None
@@ -358,48 +922,137 @@ class Client:
             self.cap.release()
             self.cap = None
 
+    def _enable_yuyv_capture(self):
+        """Switch a V4L2 camera to raw YUYV frames. Returns (width, height), or None if unsupported."""
+        if not IS_LINUX or not hasattr(self.cap, 'getBackendName'):
+            return None
+        try:
+            if self.cap.getBackendName() != 'V4L2':
+                return None
+            fourcc = cv2.VideoWriter_fourcc(*'YUYV')
+            self.cap.set(cv2.CAP_PROP_FOURCC, fourcc)
+            self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            ret, frame = self.cap.read()
+            # Devices that refused YUYV hand back MJPG or BGR, which won't be exactly 2 bytes/pixel
+            if (ret and frame is not None and frame.size == width * height * 2
+                    and int(self.cap.get(cv2.CAP_PROP_FOURCC)) == fourcc):
+                print(f"Camera delivering raw YUYV {width}x{height}")
+                return width, height
+        except cv2.error as e:
+            print(f"YUYV capture unavailable: {e}")
+        self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        return None
+
     def start_audio_stream(self):
-        if self.audio is None:
-            self.audio = pyaudio.PyAudio()
-        
-        if self.input_stream is None:
-            try:
+        if self.input_stream is not None:
+            return
+        self._opus_encoder = None
+        if HAS_OPUS:
+            self._opus_encoder = opuslib.Encoder(AUDIO_RATE, 1, opuslib.APPLICATION_VOIP)
+            self._opus_encoder.bitrate = OPUS_BITRATE
+        self._opus_frames = []
+        self._audio_sent = 0
+        try:
+            if HAS_SOUNDDEVICE:
+                # PortAudio's own thread hands us each 20 ms block, no Python read loop
+                self.input_stream = sounddevice.RawInputStream(
+                    samplerate=AUDIO_RATE, blocksize=CHUNK_SIZE, dtype='int16',
+                    channels=1, callback=self._audio_callback)
+                self.input_stream.start()
+            else:
+                if self.audio is None:
+                    self.audio = pyaudio.PyAudio()
                 self.input_stream = self.audio.open(
                     format=pyaudio.paInt16,
                     channels=1,
-                    rate=44100,  # Changed from 16000 to 44100 for better quality
+                    rate=AUDIO_RATE,
                     input=True,
                     frames_per_buffer=CHUNK_SIZE
                 )
-                print("Audio input started")
                 threading.Thread(target=self.audio_stream_loop, daemon=True).start()
-            except Exception as e:
-                print(f"Audio input error: {e}")
-                if hasattr(self, 'gui'):
-                    messagebox.showerror("Audio Error", f"Could not start microphone: {e}")
+            print("Audio input started")
+        except Exception as e:
+            self.input_stream = None
+            print(f"Audio input error: {e}")
+            if hasattr(self, 'gui'):
+                messagebox.showerror("Audio Error", f"Could not start microphone: {e}")
+
+    def _audio_callback(self, indata, frames, time_info, status):
+        if self.running:
+            self._on_audio_block(indata)
 
     def audio_stream_loop(self):
-        packet_count = 0
-        while self.running and self.input_stream and self.input_stream.is_active():
+        stream = self.input_stream
+        while self.running and self.input_stream is stream and stream.is_active():
             try:
-                data = self.input_stream.read(CHUNK_SIZE, exception_on_overflow=False)
-                self.send_udp(MessageType.AUDIO_STREAM, data)
-                packet_count += 1
-                if packet_count % 100 == 0:  # Log every 100 packets
-                    print(f"Sent {packet_count} audio packets")
-                # Small delay to reduce bandwidth
-                time.sleep(0.002)
+                self._on_audio_block(stream.read(CHUNK_SIZE, exception_on_overflow=False))
             except Exception as e:
-                if self.running:
+                if self.running and self.input_stream is stream:
                     print(f"Audio capture error: {e}")
                 break
         print("Audio stream stopped")
 
+    def _on_audio_block(self, data):
+        """Encode one captured CHUNK_SIZE block of int16 PCM and send it."""
+        if self._opus_encoder:
+            # Coalesce a few encoded frames into one datagram
+            self._opus_frames.append(self._opus_encoder.encode(bytes(data), CHUNK_SIZE))
+            if len(self._opus_frames) < OPUS_FRAMES_PER_PACKET:
+                return
+            payload = bytes((AUDIO_OPUS,)) + b''.join(_U16.pack(len(f)) + f for f in self._opus_frames)
+            self._opus_frames.clear()
+        else:
+            payload = bytes((AUDIO_PCM,)) + data
+        self.send_udp(MessageType.AUDIO_STREAM, payload)
+        self._audio_sent += 1
+        if self._audio_sent % 100 == 0:  # Log every 100 packets
+            print(f"Sent {self._audio_sent} audio packets")
+
     def stop_audio_stream(self):
-        if self.input_stream:
-            self.input_stream.stop_stream()
-            self.input_stream.close()
-            self.input_stream = None
+        stream, self.input_stream = self.input_stream, None
+        if stream:
+            if HAS_SOUNDDEVICE:
+                stream.stop()
+            else:
+                stream.stop_stream()
+            stream.close()
+
+    def decode_audio(self, payload, sender_username):
+        """Turn an AUDIO_STREAM payload into PCM bytes, or None if it can't be played."""
+        codec, body = payload[0], payload[1:]
+        if codec == AUDIO_PCM:
+            return bytes(body)
+        if codec != AUDIO_OPUS:
+            return None
+        if not HAS_OPUS:
+            if not self._opus_warned:
+                log.warning("Dropping Opus audio: opuslib or libopus is not installed (pip install opuslib)")
+                self._opus_warned = True
+            return None
+        # Opus decoders are stateful, so keep one per sender
+        decoder = self.opus_decoders.get(sender_username)
+        if decoder is None:
+            decoder = self.opus_decoders[sender_username] = opuslib.Decoder(AUDIO_RATE, 1)
+        pcm = []
+        pos = 0
+        while pos + 2 <= len(body):
+            (frame_len,) = _U16.unpack_from(body, pos)
+            pos += 2
+            pcm.append(decoder.decode(bytes(body[pos:pos + frame_len]), CHUNK_SIZE))
+            pos += frame_len
+        return b''.join(pcm)
+
+    def audio_playback_loop(self):
+        """Play queued PCM in arrival order; the blocking speaker writes pace this thread."""
+        playback_q, ready = self._playback_q, self._playback_ready
+        while self.running:
+            if not playback_q:
+                ready.wait(0.5)
+                ready.clear()
+                continue
+            self.play_audio(playback_q.popleft())
 
     def play_audio(self, audio_bytes):
         if self.output_stream is None:
@@ -415,7 +1068,7 @@ class Client:
                 open_kwargs = dict(
                     format=pyaudio.paInt16,
                     channels=1,
-                    rate=44100,  # match input
+                    rate=AUDIO_RATE,  # match input
                     output=True,
                     frames_per_buffer=CHUNK_SIZE
                 )
@@ -453,19 +1106,45 @@ class Client:
         threading.Thread(target=self.screen_share_loop, daemon=True).start()
 
     def screen_share_loop(self):
-        while self.running and self.is_sharing:
-            try:
-                img = ImageGrab.grab()
-                # Resize for bandwidth
-                img = img.resize((800, 600), Image.Resampling.LANCZOS)
-                buffer = io.BytesIO()
-                img.save(buffer, format='JPEG', quality=60)
-                img_data = base64.b64encode(buffer.getvalue()).decode()
-                self.send_tcp(MessageType.SCREEN_IMAGE, {"image": img_data, "user": self.username})
-                time.sleep(0.5)  # 2 FPS for screen
-            except Exception as e:
-                print(f"Screen share error: {e}")
-                break
+        encoder = None
+        if HAS_AV:
+            encoder = VideoEncoder(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_FPS, bit_rate=2_000_000,
+                                   gop=15 * SCREEN_FPS, candidates=VideoEncoder.SCREEN_CANDIDATES)
+            if not encoder.open():
+                encoder = None
+        self.screen_encoder = encoder
+        # mss handles are not thread-safe, so open one on the capture thread
+        sct = mss.mss() if HAS_MSS else None
+        try:
+            while self.running and self.is_sharing:
+                try:
+                    if sct:
+                        frame = cv2.cvtColor(np.asarray(sct.grab(sct.monitors[1])), cv2.COLOR_BGRA2BGR)
+                    else:
+                        frame = cv2.cvtColor(np.asarray(ImageGrab.grab().convert('RGB')), cv2.COLOR_RGB2BGR)
+                    if encoder:
+                        packets = encoder.encode(frame)
+                    else:
+                        # Resize for bandwidth
+                        frame = cv2.resize(frame, (SCREEN_WIDTH, SCREEN_HEIGHT), interpolation=cv2.INTER_AREA)
+                        packets = [encode_jpeg(frame, 60)]
+                    # Kept on TCP: inter-coded frames can't tolerate loss and keyframes exceed a datagram
+                    for packet in packets:
+                        self.send_tcp(MessageType.SCREEN_IMAGE, packet)
+                    time.sleep(1 / SCREEN_FPS)
+                except Exception as e:
+                    print(f"Screen share error: {e}")
+                    break
+        finally:
+            self.screen_encoder = None
+            if sct:
+                sct.close()
+
+    def request_keyframes(self):
+        """Force an IDR on the outgoing streams, called when a participant joins."""
+        for encoder in (self.video_encoder, self.screen_encoder):
+            if encoder:
+                encoder.request_keyframe()
 
     def stop_share_screen(self):
         self.is_sharing = False
@@ -478,32 +1157,145 @@ class Client:
     def share_file(self, filepath):
         filename = os.path.basename(filepath)
         filesize = os.path.getsize(filepath)
-        total_chunks = max(1, math.ceil(filesize / 4096))
+        total_chunks = max(1, math.ceil(filesize / FILE_CHUNK_SIZE))
         
         # Notify about file
-        self.send_tcp(MessageType.FILE_NOTIFY, {"filename": filename, "size": filesize})
+        if not self.send_tcp(MessageType.FILE_NOTIFY, {"filename": filename, "size": filesize, "chunk_size": FILE_CHUNK_SIZE}):
+            return
         if hasattr(self, 'gui') and self.gui:
             self.gui.root.after(0, self.gui.begin_file_upload, filename, filesize, total_chunks)
         
-        # Send chunks
-        with open(filepath, 'rb') as f:
-            chunk_id = 0
-            while True:
-                chunk = f.read(4096)
-                if not chunk:
+        # A reader thread keeps the disk busy while this one sends; the bounded
+        # queue holds it back when the socket (sendall) is the bottleneck. There
+        # is no sleep: the server stops reading from us while any receiver is
+        # backed up (SEND_HIGH_WATER in server3.py), so sendall blocks and paces
+        # the upload to the slowest participant
+        chunks = queue.Queue(maxsize=FILE_QUEUE_CHUNKS)
+        stop = threading.Event()
+        threading.Thread(target=self._read_file_chunks, args=(filepath, filename, chunks, stop), daemon=True).start()
+        chunk_id = 0
+        last_progress = 0.0
+        sent = False
+        try:
+            while self.running:
+                frame = chunks.get()
+                if frame is None:
+                    sent = True
                     break
-                chunk_data = base64.b64encode(chunk).decode()
-                self.send_tcp(MessageType.FILE_CHUNK, {
-                    "filename": filename,
-                    "chunk_id": chunk_id,
-                    "data": chunk_data
-                })
-                if hasattr(self, 'gui') and self.gui:
-                    self.gui.root.after(0, self.gui.update_file_upload_progress, filename, chunk_id + 1, total_chunks)
+                if isinstance(frame, OSError):
+                    print(f"File read error: {frame}")
+                    # Tell receivers to drop the partial file instead of waiting on it
+                    self.send_tcp(MessageType.FILE_ABORT, {"filename": filename})
+                    break
+                if not self.send_tcp(MessageType.FILE_CHUNK, frame):
+                    break  # the connection is gone; stop reading the file
                 chunk_id += 1
-                time.sleep(0.01)  # Small delay to avoid flooding
+                now = time.monotonic()
+                if now - last_progress >= FILE_PROGRESS_INTERVAL and hasattr(self, 'gui') and self.gui:
+                    last_progress = now
+                    self.gui.root.after(0, self.gui.update_file_upload_progress, filename, chunk_id, total_chunks)
+        finally:
+            stop.set()
         if hasattr(self, 'gui') and self.gui:
-            self.gui.root.after(0, self.gui.finish_file_upload, filename)
+            self.gui.root.after(0, self.gui.finish_file_upload, filename, sent)
+
+    def _read_file_chunks(self, filepath, filename, chunks, stop):
+        """Producer for share_file: queue framed FILE_CHUNK payloads, then None (or the OSError)."""
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            with open(filepath, 'rb') as f:
+                for chunk_id, chunk in enumerate(iter(lambda: f.read(FILE_CHUNK_SIZE), b'')):
+                    if not put(pack_binary_chunk(filename, chunk_id, chunk)):
+                        return
+        except OSError as e:
+            put(e)
+            return
+        put(None)
+
+
+# Zoom-like color scheme
+ZOOM_BG = '#1a1a1a'          # Main background (dark gray)
+ZOOM_SURFACE = '#262626'     # Elevated surfaces
+ZOOM_HEADER = '#1f1f1f'      # Header bar
+ZOOM_TILE = '#2d2d2d'        # Video tile background
+ZOOM_BLUE = '#0b5cff'        # Zoom blue accent
+ZOOM_BLUE_HOVER = '#0952cc'  # Darker blue
+ZOOM_RED = '#f55142'         # Leave button red
+ZOOM_RED_HOVER = '#cc4336'   # Darker red
+ZOOM_TEXT = '#e0e0e0'        # Primary text (light gray)
+ZOOM_TEXT_DIM = '#999'       # Secondary text
+ZOOM_BORDER = '#333'         # Borders
+
+FONT_SMALL = ('Segoe UI', 9)
+FONT_NORMAL = ('Segoe UI', 10)
+FONT_SEMIBOLD = ('Segoe UI Semibold', 10)
+FONT_SEMIBOLD_LARGE = ('Segoe UI Semibold', 11)
+FONT_BOLD = ('Segoe UI', 10, 'bold')
+FONT_TIMER = ('Segoe UI', 11, 'bold')
+FONT_TITLE = ('Segoe UI', 12, 'bold')
+FONT_SPEAKER = ('Segoe UI', 14, 'bold')
+
+# ttk styles applied by GUI.setup_styles: (style name, configure options)
+_STYLES = (
+    # Header
+    ('ZoomHeader.TFrame', {'background': ZOOM_HEADER}),
+    ('ZoomTimer.TLabel', {'background': ZOOM_HEADER, 'foreground': ZOOM_TEXT, 'font': FONT_TIMER, 'padding': (8, 4)}),
+    ('ZoomTitle.TLabel', {'background': ZOOM_HEADER, 'foreground': ZOOM_TEXT, 'font': FONT_TITLE}),
+    ('ZoomHeaderBtn.TButton', {'background': ZOOM_SURFACE, 'foreground': ZOOM_TEXT, 'padding': (8, 6), 'font': FONT_SMALL}),
+    # Body/Content
+    ('ZoomBody.TFrame', {'background': ZOOM_BG}),
+    ('ZoomGallery.TFrame', {'background': ZOOM_BG}),
+    # Speaker view
+    ('ZoomSpeaker.TFrame', {'background': ZOOM_BG}),
+    ('ZoomSpeakerName.TLabel', {'background': ZOOM_BG, 'foreground': ZOOM_TEXT, 'font': FONT_SPEAKER}),
+    # Screen share presenter
+    ('ZoomPresenterTitle.TLabel', {'background': ZOOM_BG, 'foreground': ZOOM_BLUE, 'font': FONT_TITLE}),
+    # Video tiles
+    ('ZoomVideoTile.TFrame', {'background': ZOOM_TILE, 'relief': 'flat', 'borderwidth': 2}),
+    ('ZoomVideoName.TLabel', {'background': ZOOM_TILE, 'foreground': ZOOM_TEXT, 'font': FONT_NORMAL}),
+    ('ZoomVideoNameActive.TLabel', {'background': ZOOM_TILE, 'foreground': ZOOM_BLUE, 'font': FONT_BOLD}),
+    # Sidebar
+    ('ZoomSidebar.TFrame', {'background': ZOOM_SURFACE}),
+    ('ZoomTabs.TNotebook', {'background': ZOOM_SURFACE, 'borderwidth': 0}),
+    ('ZoomTab.TFrame', {'background': ZOOM_SURFACE}),
+    ('TNotebook.Tab', {'background': ZOOM_HEADER, 'foreground': ZOOM_TEXT, 'padding': (16, 10), 'borderwidth': 0}),
+    ('ZoomParticipantCount.TLabel', {'background': ZOOM_SURFACE, 'foreground': ZOOM_TEXT, 'font': FONT_SEMIBOLD_LARGE}),
+    ('ZoomAccent.TButton', {'background': ZOOM_BLUE, 'foreground': 'white', 'padding': (12, 8), 'font': FONT_SEMIBOLD}),
+    # Control bar (bottom)
+    ('ZoomControls.TFrame', {'background': ZOOM_HEADER}),
+    ('ZoomControl.TButton', {'background': ZOOM_SURFACE, 'foreground': ZOOM_TEXT, 'padding': (16, 12), 'font': FONT_SMALL,
+                             'borderwidth': 0, 'relief': 'flat'}),
+    ('ZoomControlLabel.TLabel', {'background': ZOOM_HEADER, 'foreground': ZOOM_TEXT_DIM, 'font': FONT_NORMAL}),
+    ('ZoomLeave.TButton', {'background': ZOOM_RED, 'foreground': 'white', 'padding': (14, 10), 'font': FONT_SEMIBOLD}),
+    # Combobox
+    ('ZoomCombo.TCombobox', {'fieldbackground': ZOOM_SURFACE, 'background': ZOOM_HEADER, 'foreground': ZOOM_TEXT,
+                             'arrowcolor': ZOOM_TEXT, 'borderwidth': 1, 'relief': 'solid'}),
+    # Treeview (participants and files lists)
+    ('Treeview', {'background': ZOOM_SURFACE, 'foreground': ZOOM_TEXT, 'fieldbackground': ZOOM_SURFACE,
+                  'bordercolor': ZOOM_BORDER, 'borderwidth': 0, 'font': FONT_NORMAL, 'rowheight': 32}),
+    ('Treeview.Heading', {'background': ZOOM_HEADER, 'foreground': ZOOM_TEXT, 'font': FONT_SEMIBOLD}),
+)
+
+# State-dependent options: (style name, style.map options)
+_STYLE_MAPS = (
+    ('ZoomHeaderBtn.TButton', {'background': [('active', ZOOM_BORDER)]}),
+    ('TNotebook.Tab', {'background': [('selected', ZOOM_SURFACE), ('active', ZOOM_BORDER)],
+                       'foreground': [('selected', ZOOM_BLUE)]}),
+    ('ZoomAccent.TButton', {'background': [('active', ZOOM_BLUE_HOVER)]}),
+    ('ZoomControl.TButton', {'background': [('active', ZOOM_BORDER), ('pressed', ZOOM_BLUE)],
+                             'foreground': [('active', 'white'), ('pressed', 'white')]}),
+    ('ZoomLeave.TButton', {'background': [('active', ZOOM_RED_HOVER)]}),
+    ('ZoomCombo.TCombobox', {'fieldbackground': [('readonly', ZOOM_SURFACE)], 'foreground': [('readonly', ZOOM_TEXT)]}),
+    ('Treeview', {'background': [('selected', ZOOM_BLUE)], 'foreground': [('selected', 'white')]}),
+)
 
 
 class GUI:
@@ -518,18 +1310,43 @@ class GUI:
 
         self.permission_state = {'camera': None, 'microphone': None, 'screen': None}
         self.video_tiles = {}
+        self.video_decoders = {}
+        # Video decode runs off the Tk thread; packets that arrive while a sender's
+        # worker is busy pile up here and are decoded in one pass
+        self._decode_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        self._decode_lock = threading.Lock()
+        self._pending_frames = {}  # sender -> list of payloads not yet decoded
+        self._decoding = set()     # senders with a worker in flight
+        self._render_pending = {}  # sender -> newest decoded image not yet painted
+        self._last_render_ts = {}  # sender -> monotonic time of the last paint
+        self._departed = set()     # users who left; their in-flight frames are dropped
         self.focus_user = None
-        self.file_chunks = {}
+        self.file_spools = {}  # filename -> (temp file object, temp path) the chunks are written into
+        self._spool_lock = threading.RLock()  # file_spools/incoming_files_meta are shared with the TCP thread
         self.incoming_files_meta = {}
         self.file_rows = {}
+        self._progress_dirty = set()  # files with a progress repaint already scheduled
+        # Sidebar updates held back while their tab is hidden, applied by flush_sidebar_tab
+        self._chat_dirty = collections.deque(maxlen=MAX_CHAT_LINES)
+        self._participant_dirty = set()
+        self._participant_status_dirty = set()  # rows to repaint on the next idle pass
+        self._file_rows_dirty = set()
         self.participants = {}
         self.participant_states = {}
-        self._speaker_tokens = {}
+        self._speaker_expiry = {}  # username -> monotonic time their speaking indicator ends
+        # Speaker view: who is on stage, and their latest full-size frame awaiting paint
+        self.active_speaker = None
+        self._stage_user = None
+        self._speaker_pending = None
+        self._speaker_dirty = False
+        self._speaker_photo = None
+        self._status_reset_at = None  # monotonic time the status bar reverts to idle
         self.video_active = False
         self.mic_active = False
         self.sharing = False
         self.current_presenter = None
         self.presenter_photo = None
+        self.presenter_decoder = VideoDecoder()
         self.meeting_start = time.time()
         self.outgoing_file = None
         self.sidebar_visible = False
@@ -545,9 +1362,10 @@ class GUI:
         self.focus_banner_var = tk.StringVar(value="Focus view inactive")
 
         self._grid_dims = (0, 0)
+        self._grid_order = []  # usernames in the order their tiles were gridded
 
         self.build_layout()
-        self.update_meeting_timer()
+        self._tick()
 
         self.add_participant(self.client.username, is_self=True)
         self.update_participant_status(self.client.username, 'mic', False)
@@ -659,6 +1477,7 @@ class GUI:
 
         self.sidebar = ttk.Notebook(self.sidebar_container, style='ZoomTabs.TNotebook')
         self.sidebar.grid(row=0, column=0, sticky='nsew')
+        self.sidebar.bind('<<NotebookTabChanged>>', lambda e: self.flush_sidebar_tab())
         
         # Chat tab
         chat_tab = ttk.Frame(self.sidebar, style='ZoomTab.TFrame')
@@ -708,19 +1527,32 @@ class GUI:
         ttk.Button(files_tab, text="📤 Share File", style='ZoomAccent.TButton', 
                   command=self.share_file_cb).grid(row=0, column=0, sticky='ew', padx=12, pady=12)
         
-        files_scroll_container = ttk.Frame(files_tab, style='ZoomTab.TFrame')
-        files_scroll_container.grid(row=1, column=0, sticky='nsew', padx=12, pady=(0, 12))
-        files_scroll_container.grid_rowconfigure(0, weight=1)
-        files_scroll_container.grid_columnconfigure(0, weight=1)
+        files_list_container = ttk.Frame(files_tab, style='ZoomTab.TFrame')
+        files_list_container.grid(row=1, column=0, sticky='nsew', padx=12)
+        files_list_container.grid_rowconfigure(0, weight=1)
+        files_list_container.grid_columnconfigure(0, weight=1)
         
-        self.files_canvas = tk.Canvas(files_scroll_container, bg='#262626', highlightthickness=0)
-        self.files_canvas.grid(row=0, column=0, sticky='nsew')
-        self.files_scroll = ttk.Scrollbar(files_scroll_container, orient='vertical', command=self.files_canvas.yview)
+        # One Treeview row per file instead of a frame of widgets per file
+        self.files_tree = ttk.Treeview(files_list_container, columns=('sender', 'size', 'progress'),
+                                       show='tree headings', selectmode='browse')
+        self.files_tree.heading('#0', text='File')
+        self.files_tree.heading('sender', text='From')
+        self.files_tree.heading('size', text='Size')
+        self.files_tree.heading('progress', text='Status')
+        self.files_tree.column('#0', width=140)
+        self.files_tree.column('sender', width=80, anchor='w')
+        self.files_tree.column('size', width=80, anchor='e')
+        self.files_tree.column('progress', width=120, anchor='w')
+        self.files_tree.grid(row=0, column=0, sticky='nsew')
+        self.files_scroll = ttk.Scrollbar(files_list_container, orient='vertical', command=self.files_tree.yview)
         self.files_scroll.grid(row=0, column=1, sticky='ns')
-        self.files_canvas.configure(yscrollcommand=self.files_scroll.set)
-        self.files_frame = ttk.Frame(self.files_canvas, style='ZoomTab.TFrame')
-        self.files_canvas.create_window((0, 0), window=self.files_frame, anchor='nw')
-        self.files_frame.bind('<Configure>', lambda e: self.files_canvas.configure(scrollregion=self.files_canvas.bbox('all')))
+        self.files_tree.configure(yscrollcommand=self.files_scroll.set)
+        self.files_tree.bind('<<TreeviewSelect>>', lambda e: self.refresh_download_button())
+        self.files_tree.bind('<Double-Button-1>', lambda e: self.download_selected_file())
+        
+        self.file_download_btn = ttk.Button(files_tab, text="💾 Download", style='ZoomAccent.TButton',
+                                            command=self.download_selected_file, state='disabled')
+        self.file_download_btn.grid(row=2, column=0, sticky='e', padx=12, pady=12)
 
         # Bottom control bar (Zoom-style centered buttons)
         self.control_bar = ttk.Frame(self.root, style='ZoomControls.TFrame', padding=(20, 12))
@@ -733,27 +1565,26 @@ class GUI:
         buttons_frame = ttk.Frame(self.control_bar, style='ZoomControls.TFrame')
         buttons_frame.grid(row=0, column=1)
 
-        self.mic_btn = ttk.Button(buttons_frame, text="🎤\nUnmute", style='ZoomControl.TButton', command=self.toggle_mic, width=10)
+        self.mic_btn = ttk.Button(buttons_frame, text=MIC_OFF_TEXT, style='ZoomControl.TButton', command=self.toggle_mic, width=10)
         self.mic_btn.grid(row=0, column=0, padx=4)
         
-        self.video_btn = ttk.Button(buttons_frame, text="📹\nStart Video", style='ZoomControl.TButton', command=self.toggle_video, width=10)
+        self.video_btn = ttk.Button(buttons_frame, text=VIDEO_OFF_TEXT, style='ZoomControl.TButton', command=self.toggle_video, width=10)
         self.video_btn.grid(row=0, column=1, padx=4)
         
-        self.screen_btn = ttk.Button(buttons_frame, text="🖥️\nShare Screen", style='ZoomControl.TButton', command=self.toggle_share, width=12)
+        self.screen_btn = ttk.Button(buttons_frame, text=SHARE_OFF_TEXT, style='ZoomControl.TButton', command=self.toggle_share, width=12)
         self.screen_btn.grid(row=0, column=2, padx=4)
         
         # Camera selector (left side)
         cam_frame = ttk.Frame(self.control_bar, style='ZoomControls.TFrame')
         cam_frame.grid(row=0, column=0, sticky='w')
-        self.camera_indices, self.camera_names = self.detect_cameras()
+        # Probing cameras can take a while; fill the list in once it's done
+        self.camera_indices, self.camera_names = [], []
         ttk.Label(cam_frame, text="📷", style='ZoomControlLabel.TLabel').pack(side='left', padx=(0, 4))
-        self.camera_select = ttk.Combobox(cam_frame, values=self.camera_names or ["No camera"], 
+        self.camera_select = ttk.Combobox(cam_frame, values=["Detecting…"], 
                                          state='readonly', width=18, style='ZoomCombo.TCombobox')
         self.camera_select.pack(side='left')
-        if self.camera_names:
-            self.camera_select.current(0)
-        else:
-            self.camera_select.set("No camera")
+        self.camera_select.set("Detecting…")
+        threading.Thread(target=self._detect_cameras_async, daemon=True).start()
 
         # Leave button (right side)
         self.leave_btn = ttk.Button(self.control_bar, text="🚪 Leave Meeting", style='ZoomLeave.TButton', 
@@ -768,7 +1599,26 @@ class GUI:
             self.timer_value.set(f"{hours:02}:{minutes:02}:{seconds:02}")
         else:
             self.timer_value.set(f"{minutes:02}:{seconds:02}")
-        self.root.after(1000, self.update_meeting_timer)
+
+    def _tick(self):
+        """The GUI's only periodic timer: one 1 Hz pass over everything time-based."""
+        self.update_meeting_timer()
+        now = time.monotonic()
+        expired = [user for user, deadline in self._speaker_expiry.items() if deadline <= now]
+        for username in expired:
+            del self._speaker_expiry[username]
+            if username != self.client.username:
+                self.update_participant_status(username, 'mic', False)
+        if expired and not self._speaker_expiry:
+            self.speaker_var.set("No active speaker")
+        if self._status_reset_at is not None and now >= self._status_reset_at:
+            self.set_status("Ready to collaborate")
+        self.root.after(1000, self._tick)
+
+    def set_status(self, text, hold=None):
+        """Show `text` in the status bar; with `hold`, revert to idle after that many seconds."""
+        self.file_send_status_var.set(text)
+        self._status_reset_at = time.monotonic() + hold if hold else None
 
     def toggle_sidebar(self, tab=None):
         """Toggle sidebar visibility (Zoom-like)"""
@@ -784,6 +1634,29 @@ class GUI:
                 self.sidebar.select(2)
             else:
                 self.sidebar.select(0)
+            self.flush_sidebar_tab()
+
+    def _sidebar_tab_shown(self, index):
+        return self.sidebar_visible and self.sidebar.index('current') == index
+
+    def flush_sidebar_tab(self):
+        """Apply the updates the now-visible sidebar tab missed while hidden."""
+        if not self.sidebar_visible:
+            return
+        current = self.sidebar.index('current')
+        if current == 0 and self._chat_dirty:
+            pending, self._chat_dirty = self._chat_dirty, collections.deque(maxlen=MAX_CHAT_LINES)
+            self._insert_chat_messages(pending)
+        elif current == 1:
+            for username in self._participant_dirty:
+                self._render_participant_status(username)
+            self._participant_dirty.clear()
+        elif current == 2:
+            for filename in self._file_rows_dirty:
+                row = self.file_rows.get(filename)
+                if row and self.files_tree.exists(filename):
+                    self.files_tree.set(filename, 'progress', row['status'])
+            self._file_rows_dirty.clear()
 
     def toggle_view_mode(self):
         """Toggle between gallery and speaker view (Zoom-like)"""
@@ -792,7 +1665,7 @@ class GUI:
             self.speaker_frame.grid()
             self.video_canvas_container.grid_remove()
             self.screen_share_frame.grid_remove()
-            self.update_speaker_view()
+            self.update_speaker_view(force=True)
         else:
             self.view_mode = "gallery"
             self.speaker_frame.grid_remove()
@@ -806,8 +1679,7 @@ class GUI:
             allow = messagebox.askyesno("Permission request", f"This action requires access to your {friendly_name}. Allow?")
             self.permission_state[key] = allow
             if not allow:
-                self.file_send_status_var.set(f"{friendly_name.capitalize()} permission denied")
-                self.root.after(4000, lambda: self.file_send_status_var.set("Ready to collaborate"))
+                self.set_status(f"{friendly_name.capitalize()} permission denied", hold=4)
             return allow
         return state
 
@@ -827,7 +1699,7 @@ class GUI:
             self.client.start_video_stream(device_index=device_index)
             if self.client.cap:
                 self.video_active = True
-                self.video_btn.config(text="📹\nStop Video")
+                self.video_btn.config(text=VIDEO_ON_TEXT)
                 self.cam_state_var.set("Camera: on")
                 self.update_participant_status(self.client.username, 'video', True)
             else:
@@ -835,7 +1707,7 @@ class GUI:
         else:
             self.client.stop_video_stream()
             self.video_active = False
-            self.video_btn.config(text="📹\nStart Video")
+            self.video_btn.config(text=VIDEO_OFF_TEXT)
             self.cam_state_var.set("Camera: off")
             self.update_participant_status(self.client.username, 'video', False)
 
@@ -845,13 +1717,13 @@ class GUI:
                 return
             self.client.start_audio_stream()
             self.mic_active = True
-            self.mic_btn.config(text="🎤\nMute")
+            self.mic_btn.config(text=MIC_ON_TEXT)
             self.mic_state_var.set("Mic: live")
             self.update_participant_status(self.client.username, 'mic', True)
         else:
             self.client.stop_audio_stream()
             self.mic_active = False
-            self.mic_btn.config(text="🎤\nUnmute")
+            self.mic_btn.config(text=MIC_OFF_TEXT)
             self.mic_state_var.set("Mic: muted")
             self.update_participant_status(self.client.username, 'mic', False)
 
@@ -861,13 +1733,13 @@ class GUI:
                 return
             self.client.share_screen()
             self.sharing = True
-            self.screen_btn.config(text="🖥️\nStop Sharing")
+            self.screen_btn.config(text=SHARE_ON_TEXT)
             self.screen_state_var.set("Screen share: live")
             self.set_presenter(self.client.username)
         else:
             self.client.stop_share_screen()
             self.sharing = False
-            self.screen_btn.config(text="🖥️\nShare Screen")
+            self.screen_btn.config(text=SHARE_OFF_TEXT)
             self.screen_state_var.set("Screen share: idle")
             if self.current_presenter == self.client.username:
                 self.clear_presenter(self.client.username)
@@ -882,26 +1754,25 @@ class GUI:
     def share_file_cb(self):
         filepath = filedialog.askopenfilename()
         if filepath:
-            self.file_send_status_var.set(f"Preparing {os.path.basename(filepath)}...")
+            self.set_status(f"Preparing {os.path.basename(filepath)}...")
             threading.Thread(target=self.client.share_file, args=(filepath,), daemon=True).start()
 
     def begin_file_upload(self, filename, size, total_chunks):
         self.outgoing_file = {'name': filename, 'size': size, 'total_chunks': total_chunks}
-        self.file_send_status_var.set(f"Sending {filename} (0%)")
+        self.set_status(f"Sending {filename} (0%)")
 
     def update_file_upload_progress(self, filename, sent_chunks, total_chunks):
         if not self.outgoing_file or self.outgoing_file['name'] != filename:
             return
         percent = int((sent_chunks / max(1, total_chunks)) * 100)
-        self.file_send_status_var.set(f"Sending {filename} ({percent}%)")
+        self.set_status(f"Sending {filename} ({percent}%)")
         if percent >= 100:
-            self.file_send_status_var.set(f"Sent {filename}")
+            self.set_status(f"Sent {filename}")
 
-    def finish_file_upload(self, filename):
+    def finish_file_upload(self, filename, sent=True):
         if self.outgoing_file and self.outgoing_file['name'] == filename:
-            self.file_send_status_var.set(f"Sent {filename}")
+            self.set_status(f"Sent {filename}" if sent else f"Failed to send {filename}", hold=4)
             self.outgoing_file = None
-            self.root.after(4000, lambda: self.file_send_status_var.set("Ready to collaborate"))
 
     def handle_message(self, msg_type, payload):
         if msg_type == MessageType.CHAT:
@@ -917,22 +1788,27 @@ class GUI:
             self.clear_presenter(presenter)
             self.add_chat_message("System", f"{presenter} stopped sharing", system=True)
         elif msg_type == MessageType.FILE_NOTIFY:
+            # The temp file was already opened by spool_file_message on the TCP thread
             filename = payload['filename']
-            sender = payload.get('user', 'Someone')
             size = payload.get('size', 0)
-            self.incoming_files_meta[filename] = {'sender': sender, 'size': size, 'received': 0}
-            self.file_chunks[filename] = []
-            self.create_file_row(filename, sender, size)
+            self.create_file_row(filename, payload.get('user', 'Someone'), size)
+            if not size:
+                # Empty files send no FILE_CHUNK, so nothing else would mark them ready
+                self.update_file_row_progress(filename, 0, 0, done=True)
+        elif msg_type == MessageType.FILE_ABORT:
+            # spool_file_message already dropped the partial download
+            filename = payload['filename']
+            self._set_file_status(filename, "Failed", ready=False)
+            self.set_status(f"{filename} from {payload.get('user', 'a teammate')} could not be sent", hold=5)
         elif msg_type == MessageType.FILE_CHUNK:
+            # Repaint progress at most every 100 ms; the flush reads the latest byte count
             filename = payload['filename']
-            chunk_id = payload['chunk_id']
-            data = base64.b64decode(payload['data'])
-            info = self.incoming_files_meta.setdefault(filename, {'sender': 'Unknown', 'size': 0, 'received': 0})
-            self.file_chunks.setdefault(filename, []).append((chunk_id, data))
-            info['received'] += len(data)
-            self.update_file_row_progress(filename, info['received'], info.get('size', 0))
+            if filename not in self._progress_dirty:
+                self._progress_dirty.add(filename)
+                self.root.after(100, self._flush_progress, filename)
         elif msg_type == MessageType.USER_JOIN:
             username = payload['user']
+            self.client.request_keyframes()
             self.add_participant(username)
             self.add_chat_message("System", f"{username} joined", system=True)
         elif msg_type == MessageType.USER_LEAVE:
@@ -941,34 +1817,68 @@ class GUI:
             self.add_chat_message("System", f"{username} left", system=True)
 
     def add_chat_message(self, user, msg, system=False):
+        # Nobody can see the chat text while its tab is hidden; insert on show
+        if not self._sidebar_tab_shown(0):
+            self._chat_dirty.append((user, msg, system))
+            return
+        self._insert_chat_messages([(user, msg, system)])
+
+    def _insert_chat_messages(self, messages):
         self.chat_text.config(state='normal')
-        if system:
-            self.chat_text.insert(tk.END, f"*** {msg} ***\n", 'system')
-        else:
-            self.chat_text.insert(tk.END, f"{user}: ", 'username')
-            self.chat_text.insert(tk.END, f"{msg}\n")
+        for user, msg, system in messages:
+            if system:
+                self.chat_text.insert(tk.END, f"*** {msg} ***\n", 'system')
+            else:
+                self.chat_text.insert(tk.END, f"{user}: ", 'username')
+                self.chat_text.insert(tk.END, f"{msg}\n")
+        # Keep the Text widget bounded so inserts stay cheap in long meetings
+        lines = int(self.chat_text.index('end-1c').split('.')[0])
+        if lines > MAX_CHAT_LINES:
+            self.chat_text.delete('1.0', f'{lines - MAX_CHAT_LINES + 1}.0')
         self.chat_text.see(tk.END)
         self.chat_text.config(state='disabled')
 
-    def update_speaker_view(self):
-        """Update the speaker view with the most recent speaker"""
+    def update_speaker_view(self, force=False):
+        """Show the active speaker (or the first participant) on the speaker stage.
+
+        Only repaints when the staged user's decoder delivered a new frame, unless
+        `force` is set because the stage itself may have changed.
+        """
+        if not (force or self._speaker_dirty):
+            return
+        self._speaker_dirty = False
         if not self.video_tiles:
-            self.speaker_label.config(text="No participants yet")
+            self._stage_user = None
+            self.speaker_label.config(image='', text="No participants yet")
+            self.speaker_label.image = None
+            self._speaker_photo = None
             self.speaker_name.config(text="")
             return
-        
-        # Find most recent speaker or just show first participant
-        speaker_username = list(self.video_tiles.keys())[0]
-        if speaker_username in self.video_tiles:
-            tile = self.video_tiles[speaker_username]
-            image = tile.get('image')
-            if image:
-                self.speaker_label.config(image=image, text='')
-                self.speaker_label.image = image
-            else:
+
+        speaker_username = self.active_speaker
+        if speaker_username not in self.video_tiles:
+            speaker_username = next(iter(self.video_tiles))
+        with self._decode_lock:
+            pending, self._speaker_pending = self._speaker_pending, None
+        img = pending[1] if pending and pending[0] == speaker_username else None
+        if speaker_username != self._stage_user:
+            self._stage_user = speaker_username
+            self.speaker_name.config(text=speaker_username)
+            if img is None:
                 self.speaker_label.config(image='', text=f"Waiting for video from {speaker_username}...")
                 self.speaker_label.image = None
-            self.speaker_name.config(text=speaker_username)
+                self._speaker_photo = None
+        if img is None:
+            return
+        # Paste into the current PhotoImage; a new one is only needed when the size changes
+        photo = self._speaker_photo
+        if photo is None or (photo.width(), photo.height()) != img.size:
+            photo = ImageTk.PhotoImage(img)
+            self.speaker_label.config(image=photo, text='')
+            self.speaker_label.image = photo
+            self._speaker_photo = photo
+        else:
+            photo.paste(img)
 
     def _create_video_tile(self, username):
         tile_frame = ttk.Frame(self.video_grid_frame, style='ZoomVideoTile.TFrame', padding=4)
@@ -997,43 +1907,42 @@ class GUI:
         """Single click on video - deprecated in Zoom-like design, keeping for compatibility"""
         pass  # In real Zoom, single click doesn't do much
 
-    def reflow_video_grid(self):
-        """Reflow video tiles in Zoom-like gallery grid"""
-        tiles = list(self.video_tiles.items())
+    def reflow_video_grid(self, force=False):
+        """Reflow video tiles in Zoom-like gallery grid.
+
+        Tiles appended without changing the column count are placed on their own;
+        removals, a new column count or `force` re-place every tile.
+        """
+        names = list(self.video_tiles)
+        count = len(names)
         prev_rows, prev_cols = self._grid_dims
+        cols = COLS_FOR_COUNT[min(count, len(COLS_FOR_COUNT) - 1)]
+        row_count = -(-count // cols) if count else 0
         
-        print(f"🔄 Reflowing video grid with {len(tiles)} tiles, view_mode={self.view_mode}")
-        
-        # Clear old grid
-        for r in range(prev_rows):
-            self.video_grid_frame.grid_rowconfigure(r, weight=0)
-        for c in range(prev_cols):
-            self.video_grid_frame.grid_columnconfigure(c, weight=0)
-        for child in self.video_grid_frame.winfo_children():
-            child.grid_forget()
-        
-        count = len(tiles)
-        if not count:
-            self._grid_dims = (0, 0)
-            print("⚠️ No tiles to display")
-            return
-        
-        # Calculate optimal grid layout (Zoom uses up to 5 columns in gallery)
-        cols = min(5, max(1, int(math.ceil(math.sqrt(count)))))
-        for idx, (username, tile) in enumerate(tiles):
-            r = idx // cols
-            c = idx % cols
-            tile['frame'].grid(row=r, column=c, padx=4, pady=4, sticky='nsew')
-            print(f"  📍 Placed {username} at grid ({r}, {c})")
+        if force or cols != prev_cols or names[:len(self._grid_order)] != self._grid_order:
+            log.debug("Reflowing video grid with %d tiles, view_mode=%s", count, self.view_mode)
+            # Re-gridding a widget moves it, so remaining tiles need no grid_forget
+            for idx, username in enumerate(names):
+                self._place_tile(self.video_tiles[username], idx, cols)
+        else:
+            for idx in range(len(self._grid_order), count):
+                self._place_tile(self.video_tiles[names[idx]], idx, cols)
         
-        row_count = int(math.ceil(count / cols))
-        for r in range(row_count):
+        # Only touch the weights of rows/columns that appeared or went away
+        for r in range(row_count, prev_rows):
+            self.video_grid_frame.rowconfigure(r, weight=0)
+        for r in range(prev_rows, row_count):
             self.video_grid_frame.rowconfigure(r, weight=1)
-        for c in range(cols):
+        for c in range(cols, prev_cols):
+            self.video_grid_frame.columnconfigure(c, weight=0)
+        for c in range(prev_cols, cols):
             self.video_grid_frame.columnconfigure(c, weight=1)
         
         self._grid_dims = (row_count, cols)
-        print(f"✅ Grid configured: {row_count} rows x {cols} cols")
+        self._grid_order = names
+
+    def _place_tile(self, tile, idx, cols):
+        tile['frame'].grid(row=idx // cols, column=idx % cols, padx=4, pady=4, sticky='nsew')
 
     def refresh_tile_styles(self):
         """No longer needed - Zoom doesn't highlight focused tiles"""
@@ -1044,69 +1953,131 @@ class GUI:
         pass
 
     def update_video(self, frame_bytes, sender_username):
-        try:
-            print(f"📹 Received video from {sender_username}, {len(frame_bytes)} bytes")
-            nparr = np.frombuffer(frame_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            if frame is None:
-                print(f"❌ Failed to decode frame from {sender_username}")
+        """Queue a received video payload for decoding. Safe to call from any thread."""
+        if sender_username in self._departed:
+            return
+        with self._decode_lock:
+            self._pending_frames.setdefault(sender_username, []).append(frame_bytes)
+            if sender_username in self._decoding:
                 return
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame)
-            
-            # Resize to reasonable size for display
-            img = img.resize((320, 240), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(image=img)
-            
+            self._decoding.add(sender_username)
+        self._decode_pool.submit(self._decode_worker, sender_username)
+
+    def _decode_worker(self, sender_username):
+        try:
+            decoder = self.video_decoders.get(sender_username)
+            if decoder is None:
+                decoder = self.video_decoders[sender_username] = VideoDecoder()
+            while True:
+                with self._decode_lock:
+                    payloads = self._pending_frames.pop(sender_username, None)
+                    if not payloads:
+                        self._decoding.discard(sender_username)
+                        return
+                # H.264 needs every packet decoded in order, JPEG frames stand alone;
+                # either way only the newest picture is shown
+                frame = None
+                for i, payload in enumerate(payloads):
+                    if payload[:2] == JPEG_SOI and i < len(payloads) - 1:
+                        continue
+                    try:
+                        picture = decoder.decode(payload)
+                    except Exception as exc:
+                        # One corrupt packet must not cost the rest of the batch
+                        log.warning("Video decode error from %s: %s", sender_username, exc)
+                        continue
+                    if picture is not None:
+                        frame = picture
+                if frame is None:
+                    log.debug("Failed to decode frame from %s", sender_username)
+                    continue
+                if self.view_mode == "speaker" and sender_username == self._stage_user:
+                    self._stage_frame(sender_username, frame)
+                if frame.shape[1] != 320 or frame.shape[0] != 240:
+                    frame = cv2.resize(frame, (320, 240), interpolation=cv2.INTER_AREA)
+                img = Image.frombuffer('RGB', (320, 240), frame, 'raw', 'RGB', 0, 1)
+                # While a paint is queued just swap in the newer image, so repaints never back up
+                with self._decode_lock:
+                    queued = sender_username in self._render_pending
+                    self._render_pending[sender_username] = img
+                if not queued:
+                    delay = self._last_render_ts.get(sender_username, 0.0) + VIDEO_RENDER_INTERVAL - time.monotonic()
+                    self.root.after(max(0, int(delay * 1000)), self._apply_frame, sender_username)
+        except Exception as exc:
+            with self._decode_lock:
+                self._decoding.discard(sender_username)
+            log.warning("Video decode error: %s", exc)
+
+    def _stage_frame(self, sender_username, frame):
+        """Keep a full-size copy of the staged speaker's frame for update_speaker_view."""
+        height, width = frame.shape[:2]
+        scale = min(SPEAKER_VIEW_SIZE[0] / width, SPEAKER_VIEW_SIZE[1] / height)
+        if scale < 1:
+            frame = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        img = Image.frombuffer('RGB', (frame.shape[1], frame.shape[0]), frame, 'raw', 'RGB', 0, 1)
+        with self._decode_lock:
+            self._speaker_pending = (sender_username, img)
+
+    def _apply_frame(self, sender_username):
+        with self._decode_lock:
+            img = self._render_pending.pop(sender_username, None)
+        if img is None or sender_username in self._departed:
+            return
+        self._last_render_ts[sender_username] = time.monotonic()
+        try:
             # Create tile if it doesn't exist
             if sender_username not in self.video_tiles:
-                print(f"✨ Creating new video tile for {sender_username}")
+                log.debug("Creating new video tile for %s", sender_username)
                 self.add_participant(sender_username)
                 tile = self._create_video_tile(sender_username)
                 self.reflow_video_grid()
-                print(f"✅ Video tile created and grid reflowed. Total tiles: {len(self.video_tiles)}")
+                if self.view_mode == "speaker":
+                    self.update_speaker_view(force=True)
+                log.debug("Video tile created, total tiles: %d", len(self.video_tiles))
             else:
                 tile = self.video_tiles[sender_username]
             
-            # Update the label with the video frame
-            tile['label'].config(image=photo, text='', bg='#000000')
-            tile['label'].image = photo  # Keep a reference to prevent garbage collection
-            tile['image'] = photo
-            print(f"🖼️ Updated video tile for {sender_username}")
+            # Paste into the tile's existing PhotoImage; only the first frame configures the label
+            photo = tile['image']
+            if photo is None:
+                photo = ImageTk.PhotoImage(image=img)
+                tile['label'].config(image=photo, text='', bg='#000000')
+                tile['label'].image = photo  # Keep a reference to prevent garbage collection
+                tile['image'] = photo
+            else:
+                photo.paste(img)
             
-            # Update participant status
-            self.update_participant_status(sender_username, 'video', True)
+            # Update participant status when their video first comes on
+            if not self.participant_states.get(sender_username, {}).get('video'):
+                self.update_participant_status(sender_username, 'video', True)
             
-            # Update speaker view if in speaker mode
-            if self.view_mode == "speaker":
+            # Repaint the speaker stage only when this frame was staged for it
+            if self.view_mode == "speaker" and sender_username == self._stage_user:
+                self._speaker_dirty = True
                 self.update_speaker_view()
         except Exception as exc:
-            print(f"❌ Video update error: {exc}")
-            import traceback
-            traceback.print_exc()
+            log.warning("Video update error: %s", exc, exc_info=log.isEnabledFor(logging.DEBUG))
 
     def update_speaker(self, username):
-        token = object()
-        self._speaker_tokens[username] = token
-        self.speaker_var.set(f"{username} is speaking")
-        if username != self.client.username:
+        # _tick clears the indicator once the sender has been quiet for SPEAKER_HOLD
+        if username not in self._speaker_expiry and username != self.client.username:
             self.update_participant_status(username, 'mic', True)
-
-        def clear():
-            if self._speaker_tokens.get(username) is token:
-                self._speaker_tokens.pop(username, None)
-                if username != self.client.username:
-                    self.update_participant_status(username, 'mic', False)
-                if not self._speaker_tokens:
-                    self.speaker_var.set("No active speaker")
-
-        self.root.after(2000, clear)
+        self._speaker_expiry[username] = time.monotonic() + SPEAKER_HOLD
+        if username != self.client.username and username != self.active_speaker:
+            self.active_speaker = username
+            if self.view_mode == "speaker":
+                self.update_speaker_view(force=True)
+        text = f"{username} is speaking"
+        if self.speaker_var.get() != text:
+            self.speaker_var.set(text)
 
     def update_participant_count(self):
         total = len(self.participants)
         self.participant_count_var.set(f"Participants: {total}")
 
     def add_participant(self, username, is_self=False):
+        self._departed.discard(username)
         if username in self.participants:
             return
         icon = '👤 (You)' if is_self else '👤'
@@ -1123,10 +2094,23 @@ class GUI:
         if item_id:
             self.participants_tree.delete(item_id)
         self.participant_states.pop(username, None)
+        # Frames still queued or decoding for this user must not recreate their tile
+        self._departed.add(username)
+        with self._decode_lock:
+            self._pending_frames.pop(username, None)
+            self._render_pending.pop(username, None)
+            self._last_render_ts.pop(username, None)
+        self.video_decoders.pop(username, None)
+        self.client.opus_decoders.pop(username, None)
+        self.client._speaker_seen.pop(username, None)
+        if self._speaker_expiry.pop(username, None) and not self._speaker_expiry:
+            self.speaker_var.set("No active speaker")
         tile = self.video_tiles.pop(username, None)
         if tile:
             tile['frame'].destroy()
             self.reflow_video_grid()
+            if self.view_mode == "speaker" and username == self._stage_user:
+                self.update_speaker_view(force=True)
         if self.current_presenter == username:
             self.clear_presenter(username)
         self.update_participant_count()
@@ -1134,96 +2118,119 @@ class GUI:
     def update_participant_status(self, username, field, value):
         state = self.participant_states.setdefault(username, {'mic': False, 'video': False})
         state[field] = value
+        if not self._sidebar_tab_shown(1):
+            self._participant_dirty.add(username)
+            return
+        # Coalesce bursts of toggles into one Treeview write per participant
+        if not self._participant_status_dirty:
+            self.root.after_idle(self._flush_participant_status)
+        self._participant_status_dirty.add(username)
+
+    def _flush_participant_status(self):
+        for username in self._participant_status_dirty:
+            self._render_participant_status(username)
+        self._participant_status_dirty.clear()
+
+    def _render_participant_status(self, username):
         item_id = self.participants.get(username)
-        if not item_id:
+        state = self.participant_states.get(username)
+        if not item_id or not state:
             return
-        status_parts = []
-        if state['video']:
-            status_parts.append('📹')
-        if state['mic']:
-            status_parts.append('🎤')
-        else:
-            status_parts.append('🔇')
-        status_text = ' '.join(status_parts) if status_parts else 'Offline'
-        self.participants_tree.set(item_id, 'status', status_text)
+        self.participants_tree.set(item_id, 'status', STATUS_STRINGS[(state['video'], state['mic'])])
 
     def create_file_row(self, filename, sender, size):
-        row_frame = ttk.Frame(self.files_frame, style='ZoomFileRow.TFrame', padding=(10, 10))
-        row_frame.pack(fill='x', pady=6)
-        
-        header = ttk.Frame(row_frame, style='ZoomFileRow.TFrame')
-        header.pack(fill='x')
-        ttk.Label(header, text=f"📄 {filename}", style='ZoomFileLabel.TLabel').pack(side='left')
-        ttk.Label(header, text=f"from {sender}", style='ZoomFileCaption.TLabel').pack(side='right')
-        
         size_text = f"{size/1024:.1f} KB" if size else "Unknown size"
-        ttk.Label(row_frame, text=size_text, style='ZoomFileCaption.TLabel').pack(anchor='w', pady=(4, 0))
-        
-        progress_var = tk.DoubleVar(value=0)
-        progress = ttk.Progressbar(row_frame, variable=progress_var, maximum=100, style='ZoomProgress.Horizontal.TProgressbar')
-        progress.pack(fill='x', pady=(8, 6))
-        
-        progress_label = ttk.Label(row_frame, text="Waiting...", style='ZoomFileCaption.TLabel')
-        progress_label.pack(anchor='w')
-        
-        action_btn = ttk.Button(row_frame, text="💾 Download", style='ZoomAccent.TButton', 
-                               command=lambda: self.download_file(filename), state='disabled')
-        action_btn.pack(anchor='e', pady=(8, 0))
-        
-        self.file_rows[filename] = {
-            'frame': row_frame,
-            'progress_var': progress_var,
-            'progress_label': progress_label,
-            'button': action_btn,
-            'sender': sender,
-            'size': size
-        }
-
-    def update_file_row_progress(self, filename, received_bytes, total_bytes):
+        values = (sender, size_text, "Waiting...")
+        # A re-shared file reuses its row
+        if self.files_tree.exists(filename):
+            self.files_tree.item(filename, values=values)
+        else:
+            self.files_tree.insert('', 'end', iid=filename, text=f"📄 {filename}", values=values)
+        self.file_rows[filename] = {'sender': sender, 'size': size, 'ready': False, 'status': "Waiting..."}
+        self.refresh_download_button()
+
+    def refresh_download_button(self):
+        selection = self.files_tree.selection()
+        row = self.file_rows.get(selection[0]) if selection else None
+        self.file_download_btn.configure(state='normal' if row and row['ready'] else 'disabled')
+
+    def download_selected_file(self):
+        selection = self.files_tree.selection()
+        if selection:
+            self.download_file(selection[0])
+
+    def _flush_progress(self, filename):
+        self._progress_dirty.discard(filename)
+        info = self.incoming_files_meta.get(filename)
+        if info:
+            self.update_file_row_progress(filename, info['received'], info.get('size', 0))
+
+    def update_file_row_progress(self, filename, received_bytes, total_bytes, done=False):
         row = self.file_rows.get(filename)
         info = self.incoming_files_meta.get(filename)
         if not row:
             return
-        percent = min(100, (received_bytes / total_bytes) * 100) if total_bytes else 0
-        row['progress_var'].set(percent)
-        if total_bytes:
-            row['progress_label'].config(text=f"{percent:.0f}% ({received_bytes/1024:.1f} KB / {total_bytes/1024:.1f} KB)")
+        done = done or (total_bytes and received_bytes >= total_bytes)
+        if done:
+            row['status'] = "Ready to download"
+        elif total_bytes:
+            row['status'] = f"{min(100, (received_bytes / total_bytes) * 100):.0f}%"
         else:
-            row['progress_label'].config(text=f"{received_bytes/1024:.1f} KB received")
-        if total_bytes and received_bytes >= total_bytes:
-            row['button'].configure(state='normal')
-            row['progress_label'].config(text="Ready to download")
+            row['status'] = f"{received_bytes/1024:.1f} KB received"
+        if self._sidebar_tab_shown(2):
+            self.files_tree.set(filename, 'progress', row['status'])
+        else:
+            self._file_rows_dirty.add(filename)
+        if done:
+            row['ready'] = True
+            self.refresh_download_button()
             sender = info.get('sender', 'a teammate') if info else 'a teammate'
-            self.file_send_status_var.set(f"{filename} ready from {sender}")
-            self.root.after(5000, lambda: self.file_send_status_var.set("Ready to collaborate"))
+            self.set_status(f"{filename} ready from {sender}", hold=5)
 
     def set_presenter(self, username):
         self.current_presenter = username
+        self.presenter_decoder = VideoDecoder()
         self.presenter_title.config(text=f"{username} is sharing")
         self.screen_display.config(text="Waiting for screen frames...", image='', bg='#000000')
         self.screen_display.image = None
+        self.presenter_photo = None
         
         # Show screen share frame, hide others
         self.screen_share_frame.grid()
         self.speaker_frame.grid_remove()
         self.video_canvas_container.grid_remove()
 
-    def update_presenter_image(self, image_b64, presenter):
-        if not image_b64:
+    def update_presenter_image(self, img_data, presenter):
+        if not img_data:
             return
         try:
-            img_data = base64.b64decode(image_b64)
-            img = Image.open(io.BytesIO(img_data))
-            img.thumbnail((1200, 700), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
-            self.screen_display.config(image=photo, text='', bg='#000000')
-            self.screen_display.image = photo
-            self.presenter_photo = photo
+            frame = self.presenter_decoder.decode(img_data)
+            if frame is None:
+                if self.presenter_decoder.missing_codec and self.presenter_photo is None:
+                    # Say why the stage stays empty instead of waiting forever
+                    self.screen_display.config(text="Install PyAV (pip install av) to view this H.264 screen share")
+                return
+            # Shrink to fit the stage, keeping aspect; never upscale
+            height, width = frame.shape[:2]
+            scale = min(1200 / width, 700 / height)
+            if scale < 1:
+                frame = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            img = Image.frombuffer('RGB', (frame.shape[1], frame.shape[0]), frame, 'raw', 'RGB', 0, 1)
+            # Paste into the current PhotoImage; a new one is only needed when the size changes
+            photo = self.presenter_photo
+            if photo is None or (photo.width(), photo.height()) != img.size:
+                photo = ImageTk.PhotoImage(img)
+                self.screen_display.config(image=photo, text='', bg='#000000')
+                self.screen_display.image = photo
+                self.presenter_photo = photo
+            else:
+                photo.paste(img)
             if presenter:
                 self.presenter_title.config(text=f"{presenter} is sharing")
                 self.current_presenter = presenter
         except Exception as exc:
-            print(f"Screen image error: {exc}")
+            log.warning("Screen image error: %s", exc)
 
     def clear_presenter(self, username):
         if self.current_presenter and self.current_presenter != username:
@@ -1239,7 +2246,7 @@ class GUI:
         if self.view_mode == "speaker":
             self.speaker_frame.grid()
             self.video_canvas_container.grid_remove()
-            self.update_speaker_view()
+            self.update_speaker_view(force=True)
         else:
             # Gallery view
             self.video_canvas_container.grid()
@@ -1250,47 +2257,113 @@ class GUI:
             self.client.on_closing()
 
     def download_file(self, filename):
-        chunks = self.file_chunks.get(filename)
+        spool = self.file_spools.get(filename)
         info = self.incoming_files_meta.get(filename)
-        if not chunks or not info or info.get('received', 0) < info.get('size', 0):
+        if spool is None or not info or info.get('received', 0) < info.get('size', 0):
             messagebox.showwarning("File transfer", "File is still downloading. Please wait a moment.")
             return
-        chunks = sorted(chunks, key=lambda x: x[0])
-        data = b''.join(chunk for _, chunk in chunks)
         save_path = filedialog.asksaveasfilename(defaultextension=os.path.splitext(filename)[1], initialfile=filename)
-        if save_path:
+        if not save_path:
+            return
+        fh, tmp_path = spool
+        with self._spool_lock:
+            fh.close()
+            self.file_spools.pop(filename, None)
+        self._set_file_status(filename, "Saving...", ready=False)
+        # A move across filesystems copies the whole file, so it runs off the Tk thread
+        threading.Thread(target=self._save_download, args=(filename, tmp_path, save_path)).start()
+
+    def _save_download(self, filename, tmp_path, save_path):
+        try:
+            shutil.move(tmp_path, save_path)
+        except Exception as exc:
+            self.root.after(0, self._download_failed, filename, tmp_path, exc)
+            return
+        self.root.after(0, self._download_saved, filename, save_path)
+
+    def _download_saved(self, filename, save_path):
+        self._set_file_status(filename, "Saved", ready=False)
+        messagebox.showinfo("File saved", f"Saved to {save_path}")
+
+    def _download_failed(self, filename, tmp_path, exc):
+        # The temp file is still intact; put it back so the user can retry
+        with self._spool_lock:
+            self.file_spools[filename] = (open(tmp_path, 'rb+'), tmp_path)
+        self._set_file_status(filename, "Ready to download", ready=True)
+        messagebox.showerror("File error", f"Could not save file: {exc}")
+
+    def _set_file_status(self, filename, status, ready):
+        row = self.file_rows.get(filename)
+        if not row:
+            return
+        row['ready'] = ready
+        row['status'] = status
+        self.files_tree.set(filename, 'progress', status)
+        self.refresh_download_button()
+
+    def spool_file_message(self, msg_type, payload):
+        """Record a FILE_NOTIFY/FILE_CHUNK/FILE_ABORT and write chunk data to disk.
+
+        Runs on the TCP receive thread so disk writes never stall the Tk thread.
+        Returns the payload to hand to handle_message, with chunk data dropped.
+        """
+        filename = payload['filename']
+        with self._spool_lock:
+            if msg_type == MessageType.FILE_NOTIFY:
+                size = payload.get('size', 0)
+                self.incoming_files_meta[filename] = {'sender': payload.get('user', 'Someone'), 'size': size, 'received': 0,
+                                                      'chunk_size': payload.get('chunk_size', FILE_CHUNK_SIZE)}
+                self.discard_file_spool(filename)
+                self.file_spools[filename] = open_spool_file(filename, size)
+                return payload
+            if msg_type == MessageType.FILE_ABORT:
+                self.incoming_files_meta.pop(filename, None)
+                self.discard_file_spool(filename)
+                return payload
+            data = payload['data']
+            info = self.incoming_files_meta.setdefault(filename, {'sender': 'Unknown', 'size': 0, 'received': 0})
+            if filename not in self.file_spools:
+                self.file_spools[filename] = open_spool_file(filename, 0)
+            write_at(self.file_spools[filename][0], data, payload['chunk_id'] * info.get('chunk_size', FILE_CHUNK_SIZE))
+            info['received'] += len(data)
+        return {'filename': filename, 'chunk_id': payload['chunk_id']}
+
+    def discard_file_spool(self, filename):
+        """Close and delete the temp file of a download that was never saved."""
+        with self._spool_lock:
+            spool = self.file_spools.pop(filename, None)
+        if spool:
+            fh, tmp_path = spool
             try:
-                with open(save_path, 'wb') as file_obj:
-                    file_obj.write(data)
-                messagebox.showinfo("File saved", f"Saved to {save_path}")
-            except Exception as exc:
-                messagebox.showerror("File error", f"Could not save file: {exc}")
+                fh.close()
+                os.remove(tmp_path)
+            except OSError:
+                pass
 
     def detect_cameras(self, max_index=2):  # Reduced from 5 to 2 for faster detection
-        indices = []
-        names = []
+        candidates = range(max_index + 1)
+        if IS_LINUX:
+            # Only probe indices that have a device node
+            present = {int(path[len('/dev/video'):]) for path in glob.glob('/dev/video[0-9]*')
+                       if path[len('/dev/video'):].isdigit()}
+            candidates = [i for i in candidates if i in present]
         
-        # Try only first few indices to avoid excessive warnings
-        for i in range(max_index + 1):
+        # Probe all indices at once; a device that hangs in open/read is given up on.
+        # Daemon threads, so a probe stuck in the driver can't block interpreter exit
+        results = queue.Queue()
+        for i in candidates:
+            threading.Thread(target=lambda i=i: results.put((i, self._probe_camera(i))), daemon=True).start()
+        found = []
+        deadline = time.monotonic() + CAMERA_PROBE_TIMEOUT
+        for _ in candidates:
             try:
-                # Use appropriate backend for the OS
-                if IS_WINDOWS:
-                    cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-                elif IS_LINUX:
-                    cap = cv2.VideoCapture(i, cv2.CAP_V4L2)
-                else:
-                    cap = cv2.VideoCapture(i)
-                
-                if cap.isOpened():
-                    # Verify we can actually read from it
-                    ret, _ = cap.read()
-                    if ret:
-                        indices.append(i)
-                        names.append(f"Camera {i}")
-                cap.release()
-            except Exception as e:
-                print(f"Camera {i} detection error: {e}")
-                continue
+                i, ok = results.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if ok:
+                found.append(i)
+        indices = sorted(found)
+        names = [f"Camera {i}" for i in indices]
         
         # If no cameras found, add virtual camera option
         if not indices and HAS_VIRTUAL_CAMERA:
@@ -1299,113 +2372,53 @@ class GUI:
         
         return indices, names
 
+    def _detect_cameras_async(self):
+        indices, names = self.detect_cameras()
+        try:
+            self.root.after(0, self._apply_camera_list, indices, names)
+        except RuntimeError:
+            pass  # window closed while probing
+
+    def _apply_camera_list(self, indices, names):
+        self.camera_indices, self.camera_names = indices, names
+        self.camera_select['values'] = names or ["No camera"]
+        if names:
+            self.camera_select.current(0)
+        else:
+            self.camera_select.set("No camera")
+
+    @staticmethod
+    def _probe_camera(i):
+        """Return True if camera `i` opens and delivers a frame."""
+        try:
+            # Use appropriate backend for the OS
+            if IS_WINDOWS:
+                cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
+            elif IS_LINUX:
+                cap = cv2.VideoCapture(i, cv2.CAP_V4L2)
+            else:
+                cap = cv2.VideoCapture(i)
+            
+            try:
+                # Verify we can actually read from it
+                return cap.isOpened() and cap.read()[0]
+            finally:
+                cap.release()
+        except Exception as e:
+            print(f"Camera {i} detection error: {e}")
+            return False
+
     def setup_styles(self):
-        # Zoom-like color scheme
-        zoom_bg = '#1a1a1a'          # Main background (dark gray)
-        zoom_surface = '#262626'      # Elevated surfaces
-        zoom_header = '#1f1f1f'       # Header bar
-        zoom_blue = '#0b5cff'         # Zoom blue accent
-        zoom_blue_hover = '#0952cc'   # Darker blue
-        zoom_red = '#f55142'          # Leave button red
-        zoom_red_hover = '#cc4336'    # Darker red
-        zoom_text = '#e0e0e0'         # Primary text (light gray)
-        zoom_text_dim = '#999'        # Secondary text
-        zoom_border = '#333'          # Borders
-
-        self.root.configure(bg=zoom_bg)
+        self.root.configure(bg=ZOOM_BG)
         style = ttk.Style(self.root)
         try:
             style.theme_use('clam')
         except Exception:
             pass
-
-        # Header styles
-        style.configure('ZoomHeader.TFrame', background=zoom_header)
-        style.configure('ZoomTimer.TLabel', background=zoom_header, foreground=zoom_text, 
-                       font=('Segoe UI', 11, 'bold'), padding=(8, 4))
-        style.configure('ZoomTitle.TLabel', background=zoom_header, foreground=zoom_text,
-                       font=('Segoe UI', 12, 'bold'))
-        style.configure('ZoomHeaderBtn.TButton', background=zoom_surface, foreground=zoom_text,
-                       padding=(8, 6), font=('Segoe UI', 9))
-        style.map('ZoomHeaderBtn.TButton', background=[('active', zoom_border)])
-
-        # Body/Content
-        style.configure('ZoomBody.TFrame', background=zoom_bg)
-        style.configure('ZoomGallery.TFrame', background=zoom_bg)
-        
-        # Speaker view
-        style.configure('ZoomSpeaker.TFrame', background=zoom_bg)
-        style.configure('ZoomSpeakerName.TLabel', background=zoom_bg, foreground=zoom_text,
-                       font=('Segoe UI', 14, 'bold'))
-        
-        # Screen share presenter
-        style.configure('ZoomPresenterTitle.TLabel', background=zoom_bg, foreground=zoom_blue,
-                       font=('Segoe UI', 12, 'bold'))
-
-        # Video tiles
-        style.configure('ZoomVideoTile.TFrame', background='#2d2d2d', relief='flat', borderwidth=2)
-        style.configure('ZoomVideoName.TLabel', background='#2d2d2d', foreground=zoom_text,
-                       font=('Segoe UI', 10))
-        style.configure('ZoomVideoNameActive.TLabel', background='#2d2d2d', foreground=zoom_blue,
-                       font=('Segoe UI', 10, 'bold'))
-
-        # Sidebar
-        style.configure('ZoomSidebar.TFrame', background=zoom_surface)
-        style.configure('ZoomTabs.TNotebook', background=zoom_surface, borderwidth=0)
-        style.configure('ZoomTab.TFrame', background=zoom_surface)
-        style.configure('TNotebook.Tab', background=zoom_header, foreground=zoom_text,
-                       padding=(16, 10), borderwidth=0)
-        style.map('TNotebook.Tab', 
-                 background=[('selected', zoom_surface), ('active', zoom_border)],
-                 foreground=[('selected', zoom_blue)])
-        
-        style.configure('ZoomParticipantCount.TLabel', background=zoom_surface, foreground=zoom_text,
-                       font=('Segoe UI Semibold', 11))
-        style.configure('ZoomAccent.TButton', background=zoom_blue, foreground='white',
-                       padding=(12, 8), font=('Segoe UI Semibold', 10))
-        style.map('ZoomAccent.TButton', background=[('active', zoom_blue_hover)])
-
-        # Control bar (bottom)
-        style.configure('ZoomControls.TFrame', background=zoom_header)
-        style.configure('ZoomControl.TButton', background=zoom_surface, foreground=zoom_text,
-                       padding=(16, 12), font=('Segoe UI', 9), borderwidth=0, relief='flat')
-        style.map('ZoomControl.TButton',
-                 background=[('active', zoom_border), ('pressed', zoom_blue)],
-                 foreground=[('active', 'white'), ('pressed', 'white')])
-        
-        style.configure('ZoomControlLabel.TLabel', background=zoom_header, foreground=zoom_text_dim,
-                       font=('Segoe UI', 10))
-        
-        style.configure('ZoomLeave.TButton', background=zoom_red, foreground='white',
-                       padding=(14, 10), font=('Segoe UI Semibold', 10))
-        style.map('ZoomLeave.TButton', background=[('active', zoom_red_hover)])
-
-        # Combobox
-        style.configure('ZoomCombo.TCombobox', fieldbackground=zoom_surface, background=zoom_header,
-                       foreground=zoom_text, arrowcolor=zoom_text, borderwidth=1, relief='solid')
-        style.map('ZoomCombo.TCombobox', 
-                 fieldbackground=[('readonly', zoom_surface)],
-                 foreground=[('readonly', zoom_text)])
-
-        # Treeview (participants list)
-        style.configure('Treeview', background=zoom_surface, foreground=zoom_text,
-                       fieldbackground=zoom_surface, bordercolor=zoom_border, borderwidth=0,
-                       font=('Segoe UI', 10), rowheight=32)
-        style.configure('Treeview.Heading', background=zoom_header, foreground=zoom_text,
-                       font=('Segoe UI Semibold', 10))
-        style.map('Treeview', background=[('selected', zoom_blue)], foreground=[('selected', 'white')])
-
-        # File row
-        style.configure('ZoomFileRow.TFrame', background=zoom_surface)
-        style.configure('ZoomFileLabel.TLabel', background=zoom_surface, foreground=zoom_text,
-                       font=('Segoe UI', 10))
-        style.configure('ZoomFileCaption.TLabel', background=zoom_surface, foreground=zoom_text_dim,
-                       font=('Segoe UI', 9))
-
-        # Progress bar
-        style.configure('ZoomProgress.Horizontal.TProgressbar', troughcolor=zoom_border,
-                       bordercolor=zoom_border, background=zoom_blue, lightcolor=zoom_blue,
-                       darkcolor=zoom_blue)
+        for name, options in _STYLES:
+            style.configure(name, **options)
+        for name, options in _STYLE_MAPS:
+            style.map(name, **options)
 
 
 if __name__ == "__main__":
@@ -1414,4 +2427,5 @@ if __name__ == "__main__":
         print("Example: python client.py 192.168.1.100 Alice")
         sys.exit(1)
     
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(name)s: %(message)s')
     client = Client(sys.argv[1], sys.argv[2])
\ No newline at end of file
@@ -1,10 +1,30 @@
+import collections
+import ctypes
+import itertools
+import os
+import platform
+import selectors
 import socket
 import threading
 import struct
 import time
-import json
 from enum import Enum
 
+import msgpack
+
+# One sendmmsg(2) call fans a relayed datagram out to every recipient, Linux only
+HAS_SENDMMSG = False
+if platform.system() == 'Linux':
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.sendmmsg.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int)
+        HAS_SENDMMSG = True
+    except (OSError, AttributeError):
+        pass
+
+# Queued TCP frames go out in one gathered sendmsg(2) call where available (not on Windows)
+HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+
 class MessageType(Enum):
     CHAT = 1
     FILE_NOTIFY = 2
@@ -18,30 +38,262 @@ class MessageType(Enum):
     VIDEO_STREAM = 10
     AUDIO_STREAM = 11
     UDP_REGISTER = 12  # NEW: Client registers UDP port
+    FILE_ABORT = 13  # sender could not finish a file; receivers drop it
+
+# Wire value -> MessageType, cheaper than calling the Enum per frame
+_MSG_BY_VAL = {m.value: m for m in MessageType}
+# Raw type bytes of the only datagrams the UDP relay forwards
+_MEDIA_TYPES = frozenset((MessageType.VIDEO_STREAM.value, MessageType.AUDIO_STREAM.value))
+
+# Messages whose payload is a raw binary frame rather than a msgpack map
+BINARY_MESSAGES = {MessageType.FILE_CHUNK, MessageType.SCREEN_IMAGE}
+# Relayed maps the server only stamps with the sender; they are never unpacked
+STAMPED_MESSAGES = {MessageType.FILE_NOTIFY, MessageType.FILE_ABORT, MessageType.SCREEN_START, MessageType.SCREEN_STOP}
+# Everything the TCP reader passes on as bytes
+_RAW_MESSAGES = frozenset(BINARY_MESSAGES | STAMPED_MESSAGES)
 
 HOST = '0.0.0.0'
 TCP_PORT = 5000
 UDP_PORT = 5001
 BUFFER_SIZE = 65536  # Increased for images
+SOCK_BUF_SIZE = 2 << 20      # 2 MB kernel buffers on client TCP sockets
+UDP_SOCK_BUF_SIZE = 4 << 20  # 4 MB on the relay socket to absorb video bursts
+# 0: errors only, 1: connections and errors (default), 2: also per-message events
+LOG_LEVEL = int(os.environ.get('LOG_LEVEL', 1))
+# Per-datagram UDP errors are printed at most this often
+UDP_ERROR_INTERVAL = 5.0
+
+# Precompiled frame layouts: type byte + payload length, and a bare length prefix
+_HDR = struct.Struct('!BI')
+_LEN = struct.Struct('!I')
+_U16 = struct.Struct('!H')  # msgpack map16 counts and SCREEN_IMAGE sender name lengths
+_USER_KEY = msgpack.packb('user')
+# One reused Packer instead of a new one per packb call. Packers aren't thread-safe;
+# everything that packs runs on the selector thread.
+_packb = msgpack.Packer(use_bin_type=True).pack
+
+
+def stamp_user(payload_bytes, username):
+    """Append a 'user' entry to a packed msgpack map without unpacking it.
+
+    Unpacking keeps the last duplicate key, so this overrides any 'user' the
+    sender put in themselves.
+    """
+    entry = _USER_KEY + _packb(username)
+    head = payload_bytes[0]
+    if 0x80 <= head < 0x8f:  # fixmap
+        return bytes((head + 1,)) + payload_bytes[1:] + entry
+    if head == 0x8f:  # a full fixmap grows into a map16
+        return b'\xde' + _U16.pack(16) + payload_bytes[1:] + entry
+    if head == 0xde and _U16.unpack_from(payload_bytes, 1)[0] < 0xffff:
+        return b'\xde' + _U16.pack(_U16.unpack_from(payload_bytes, 1)[0] + 1) + payload_bytes[3:] + entry
+    payload = msgpack.unpackb(payload_bytes)
+    if not isinstance(payload, dict):
+        raise ValueError("expected a msgpack map")
+    payload['user'] = username
+    return _packb(payload)
+
+# Accept threads, each with its own SO_REUSEPORT listener where the OS supports it
+LISTENER_COUNT = max(1, (os.cpu_count() or 2) // 2)
+# Recipients per sendmmsg call when relaying UDP
+UDP_FANOUT_SIZE = 64
+# Free bytes kept in front of each received datagram, where the relay header is written
+UDP_HEADROOM = 256
+# Queued frames handed to one sendmsg call
+SEND_IOV_MAX = 64
+# Bytes queued for one client before senders stop being read, and the level it
+# must drain below before reading resumes
+SEND_HIGH_WATER = 4 * 1024 * 1024
+SEND_LOW_WATER = 1024 * 1024
+# Bytes queued for one client before it is dropped as too slow to keep up
+MAX_SEND_BACKLOG = 64 * 1024 * 1024
+# Seconds a client over SEND_HIGH_WATER may take no data before it is dropped
+SEND_STALL_TIMEOUT = 10
+
+class _SockaddrIn(ctypes.Structure):
+    _fields_ = [('sin_family', ctypes.c_ushort), ('sin_port', ctypes.c_uint16),
+                ('sin_addr', ctypes.c_uint8 * 4), ('sin_zero', ctypes.c_uint8 * 8)]
+
+
+class _Iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+
+class _Msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_Iovec)), ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class _Mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _Msghdr), ('msg_len', ctypes.c_uint)]
+
+
+class FanoutBatch:
+    """Preallocated mmsghdr array that sends one datagram to up to `size` addresses per syscall.
+
+    Every message shares the same iovecs, so the datagram is gathered from up to
+    `parts` bytes objects without being copied or joined.
+    """
+
+    def __init__(self, size=UDP_FANOUT_SIZE, parts=2):
+        self.size = size
+        self.parts = parts
+        self._iov = (_Iovec * parts)()
+        self._msgs = (_Mmsghdr * size)()
+        self._addrs = {}  # (ip, port) -> _SockaddrIn
+        for i in range(size):
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_namelen = ctypes.sizeof(_SockaddrIn)
+            hdr.msg_iov = ctypes.pointer(self._iov[0])
+
+    def _sockaddr(self, addr):
+        sockaddr = self._addrs.get(addr)
+        if sockaddr is None:
+            ip, port = addr
+            sockaddr = self._addrs[addr] = _SockaddrIn(socket.AF_INET, socket.htons(port),
+                                                       (ctypes.c_uint8 * 4)(*socket.inet_aton(ip)))
+        return sockaddr
+
+    def send(self, fd, chunks, addrs):
+        """Send `chunks` as one datagram to each of `addrs`; raises the first error after trying all."""
+        if len(self._addrs) > 4 * self.size:
+            self._addrs.clear()  # drop addresses of clients that have left
+        for j, data in enumerate(chunks):
+            # Point straight at the caller's buffer, no copy: bytes via c_char_p,
+            # writable buffers (bytearrays and views of them) via from_buffer
+            if isinstance(data, bytes):
+                self._iov[j].iov_base = ctypes.cast(ctypes.c_char_p(data), ctypes.c_void_p)
+            elif len(data):
+                self._iov[j].iov_base = ctypes.addressof(ctypes.c_char.from_buffer(data))
+            self._iov[j].iov_len = len(data)
+        error = None
+        for start in range(0, len(addrs), self.size):
+            batch = addrs[start:start + self.size]
+            for i, addr in enumerate(batch):
+                hdr = self._msgs[i].msg_hdr
+                hdr.msg_name = ctypes.addressof(self._sockaddr(addr))
+                hdr.msg_iovlen = len(chunks)
+            sent, count = 0, len(batch)
+            while sent < count:
+                n = _libc.sendmmsg(fd, ctypes.byref(self._msgs, sent * ctypes.sizeof(_Mmsghdr)), count - sent, 0)
+                if n < 0:
+                    # Skip the recipient that failed and carry on with the rest
+                    err = ctypes.get_errno()
+                    error = error or OSError(err, f"{os.strerror(err)} ({batch[sent][0]}:{batch[sent][1]})")
+                    n = 1
+                sent += n
+        if error:
+            raise error
+
+
+class ClientConnection:
+    """Per-socket state owned by the selector loop."""
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.username = None  # set once the handshake line arrives
+        self.recv_buf = bytearray()
+        self.recv_pos = 0  # start of the first unparsed message in recv_buf
+        self.send_buf = collections.deque()
+        self.queued = 0  # bytes in send_buf
+        self.writing = False  # registered for EVENT_WRITE (or about to be)
+        self.reading = True  # False while paused for backpressure
+        self.events = 0  # mask currently registered with the selector
+        self.last_sent = 0.0  # monotonic time of the last write while congested
+        self.closed = False
 
 class Server:
     def __init__(self):
-        self.tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # With SO_REUSEPORT the kernel spreads incoming connections over several
+        # listeners, so a burst of joins isn't serialised on one accept queue
+        count = LISTENER_COUNT if hasattr(socket, 'SO_REUSEPORT') else 1
+        if count > 1:
+            self._check_port_free()
+        self.tcp_sockets = [self._create_listener(count > 1) for _ in range(count)]
         self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.tcp_socket.bind((HOST, TCP_PORT))
+        self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, UDP_SOCK_BUF_SIZE)
+        self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_SOCK_BUF_SIZE)
         self.udp_socket.bind((HOST, UDP_PORT))
-        self.tcp_socket.listen(5)
         
-        # Store client info: {username: {'tcp': sock, 'udp_addr': (ip, port), 'tcp_addr': addr}}
+        # Store client info: {username: {'tcp': sock, 'udp_addr': (ip, port), 'tcp_addr': addr, 'conn': ClientConnection}}
         self.clients = {}
         self.clients_lock = threading.Lock()
+        # Reverse index for the UDP relay: udp addr -> (username, relay header).
+        # Written under clients_lock, read without it.
+        self.udp_senders = {}
+        # Flat (username, conn) / (username, udp_addr) lists for the broadcast loops,
+        # rebuilt by _rebuild_targets on every membership change
+        self._tcp_targets = []
+        self._udp_targets = []
+        
+        # All TCP sockets are served by one selector thread. Other threads queue
+        # writes and poke it through the wake socket.
+        self.selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, self._drain_wake)
+        self._new_conns = collections.deque()  # accepted sockets awaiting registration
+        self._write_ready = collections.deque()  # connections that just got data queued
+        self._congested = set()  # connections over SEND_HIGH_WATER, guarded by _send_lock
+        self._paused = []  # sources whose reads are paused until _congested empties
+        self._send_lock = threading.Lock()
+        self._io_thread_id = None
+        self._recv_scratch = bytearray(BUFFER_SIZE)
+        self._tcp_handlers = {
+            MessageType.CHAT: self._handle_chat,
+            MessageType.UDP_REGISTER: self._handle_udp_register,
+            MessageType.FILE_NOTIFY: self._handle_file_notify,
+            MessageType.FILE_CHUNK: self._handle_file_chunk,
+            MessageType.FILE_ABORT: self._handle_file_abort,
+            MessageType.SCREEN_START: self._handle_screen_start,
+            MessageType.SCREEN_IMAGE: self._handle_screen_image,
+            MessageType.SCREEN_STOP: self._handle_screen_stop,
+        }
+        self._fanout = FanoutBatch() if HAS_SENDMMSG else None
+        # UDP datagrams land in one reused buffer, after UDP_HEADROOM spare bytes,
+        # and are relayed straight out of it
+        self._udp_buf = bytearray(UDP_HEADROOM + BUFFER_SIZE)
+        self._udp_mv = memoryview(self._udp_buf)
+        self._udp_recv_view = self._udp_mv[UDP_HEADROOM:]
+        self._udp_error_at = float('-inf')
+        self._udp_errors = 0
         
         print(f"Server listening on TCP:{TCP_PORT}, UDP:{UDP_PORT}")
 
+    def _check_port_free(self):
+        """Raise like a plain bind would if TCP_PORT is taken.
+
+        SO_REUSEPORT would otherwise let a second server bind the same port, and
+        the kernel would quietly split new clients between two meetings.
+        """
+        probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            probe.bind((HOST, TCP_PORT))
+        finally:
+            probe.close()
+
+    def _create_listener(self, reuse_port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if hasattr(socket, 'TCP_DEFER_ACCEPT'):
+            # Linux: only wake accept() once the username has arrived
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, 5)
+        sock.bind((HOST, TCP_PORT))
+        sock.listen(5)
+        return sock
+
     def start(self):
-        threading.Thread(target=self.handle_tcp_connections, daemon=True).start()
+        threading.Thread(target=self.serve_tcp, daemon=True).start()
+        for listener in self.tcp_sockets:
+            threading.Thread(target=self.handle_tcp_connections, args=(listener,), daemon=True).start()
         threading.Thread(target=self.handle_udp_packets, daemon=True).start()
         
         print("Server started. Press Ctrl+C to stop.")
@@ -51,185 +303,438 @@ class Server:
         except KeyboardInterrupt:
             print("\nShutting down server...")
 
-    def handle_tcp_connections(self):
+    def serve_tcp(self):
+        self._io_thread_id = threading.get_ident()
+        select, flush_client, read_client = self.selector.select, self.flush_client, self.read_client
+        EVENT_READ, EVENT_WRITE = selectors.EVENT_READ, selectors.EVENT_WRITE
+        while True:
+            # Wake periodically while congested, so stalled receivers get dropped
+            for key, mask in select(1.0 if self._congested else None):
+                try:
+                    conn = key.data
+                    if not isinstance(conn, ClientConnection):
+                        conn()  # listener or wake socket
+                        continue
+                    if conn.closed:
+                        continue  # dropped earlier in this batch
+                    if mask & EVENT_WRITE:
+                        flush_client(conn)
+                    if mask & EVENT_READ and not conn.closed:
+                        read_client(conn)
+                except Exception as e:
+                    print(f"TCP loop error: {e}")
+            self._register_new_clients()
+            self._arm_writers()
+            if self._congested:
+                self._drop_stalled()
+            if self._paused and not self._congested:
+                self._resume_reads()
+
+    def handle_tcp_connections(self, listener):
         while True:
             try:
-                client_sock, addr = self.tcp_socket.accept()
-                threading.Thread(target=self.handle_client_tcp, args=(client_sock, addr), daemon=True).start()
+                client_sock, addr = listener.accept()
+                client_sock.setblocking(False)
+                # Our own send queue decides batching, so don't let Nagle hold small frames
+                client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                client_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF_SIZE)
+                client_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF_SIZE)
+                self._new_conns.append(ClientConnection(client_sock, addr))
+                self._wake_w.send(b'\0')
+            except BlockingIOError:
+                pass  # a wakeup is already pending
             except Exception as e:
                 print(f"TCP accept error: {e}")
 
-    def handle_client_tcp(self, client_sock, addr):
-        username = None
+    def _register_new_clients(self):
+        """Hand sockets from the accept threads to the selector."""
+        while self._new_conns:
+            conn = self._new_conns.popleft()
+            self._update_events(conn, False)
+
+    def register_client(self, conn, data):
+        # Receive username
+        username = data.decode().strip()
+        if not username:
+            self.handle_disconnect(conn)
+            return
+        
+        # Make username unique
+        original_username = username
+        counter = 1
+        with self.clients_lock:
+            while username in self.clients:
+                username = f"{original_username}_{counter}"
+                counter += 1
+            
+            # Send the length-prefixed confirmation before the connection can
+            # appear in any broadcast, so it is always the first thing on the wire
+            name = username.encode()
+            self.queue_send(conn, _LEN.pack(len(name)) + name)
+            self.clients[username] = {
+                'tcp': conn.sock,
+                'udp_addr': None,
+                'tcp_addr': conn.addr,
+                'conn': conn
+            }
+            self._rebuild_targets()
+        conn.username = username
+        
+        if LOG_LEVEL >= 1:
+            print(f"{username} connected from {conn.addr}")
+        
+        # Notify all other clients
+        self.broadcast_tcp(MessageType.USER_JOIN, {"user": username}, exclude_username=username)
+
+    def read_client(self, conn):
         try:
-            # Receive username
-            username = client_sock.recv(1024).decode().strip()
-            if not username:
+            n = conn.sock.recv_into(self._recv_scratch)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            print(f"Error with client {conn.username}: {e}")
+            n = 0
+        if not n:
+            self.handle_disconnect(conn)
+            return
+        
+        with memoryview(self._recv_scratch) as view:
+            if conn.username is None:
+                self.register_client(conn, bytes(view[:n]))
                 return
-            
-            # Make username unique
-            original_username = username
-            counter = 1
-            with self.clients_lock:
-                while username in self.clients:
-                    username = f"{original_username}_{counter}"
-                    counter += 1
-                
-                self.clients[username] = {
-                    'tcp': client_sock,
-                    'udp_addr': None,
-                    'tcp_addr': addr
-                }
-            
-            print(f"{username} connected from {addr}")
-            
-            # Send confirmation back
-            client_sock.send(username.encode())
-            
-            # Notify all other clients
-            self.broadcast_tcp(MessageType.USER_JOIN, {"user": username}, exclude_username=username)
-            
-            # Main message loop
-            buffer = b''
-            while True:
-                data = client_sock.recv(BUFFER_SIZE)
-                if not data:
-                    break
+            conn.recv_buf += view[:n]
+        
+        # Process complete messages
+        buffer = conn.recv_buf
+        pos = conn.recv_pos
+        size = len(buffer)
+        messages = []
+        append, unpack_from = messages.append, _HDR.unpack_from
+        with memoryview(buffer) as view:
+            while size - pos >= 5:
+                msg_type_byte, length = unpack_from(buffer, pos)
                 
-                buffer += data
+                if size - pos < 5 + length:
+                    break  # Wait for more data
                 
-                # Process complete messages
-                while len(buffer) >= 5:
-                    msg_type_byte = buffer[0]
-                    length = struct.unpack('!I', buffer[1:5])[0]
-                    
-                    if len(buffer) < 5 + length:
-                        break  # Wait for more data
-                    
-                    msg_type = MessageType(msg_type_byte)
-                    payload_bytes = buffer[5:5+length]
-                    buffer = buffer[5+length:]
-                    
-                    try:
-                        payload = json.loads(payload_bytes.decode())
-                        self.handle_tcp_message(msg_type, payload, username)
-                    except Exception as e:
-                        print(f"Error processing message from {username}: {e}")
-                        
-        except Exception as e:
-            print(f"Error with client {username}: {e}")
-        finally:
-            self.handle_disconnect(username)
+                append((msg_type_byte, bytes(view[pos + 5:pos + 5 + length])))
+                pos += 5 + length
+        
+        # Compact only once the consumed prefix is the larger half
+        if pos > len(buffer) // 2:
+            del buffer[:pos]
+            pos = 0
+        conn.recv_pos = pos
+        
+        handle, unpackb, username = self.handle_tcp_message, msgpack.unpackb, conn.username
+        for msg_type_byte, payload_bytes in messages:
+            try:
+                msg_type = _MSG_BY_VAL[msg_type_byte]
+                payload = payload_bytes if msg_type in _RAW_MESSAGES else unpackb(payload_bytes)
+                handle(msg_type, payload, username)
+            except Exception as e:
+                print(f"Error processing message from {username}: {e}")
+        
+        if self._congested and conn.reading and not conn.closed:
+            # A receiver is over SEND_HIGH_WATER: stop reading this source until it
+            # drains, so TCP flow control paces the sender to the slowest receiver
+            self._pause_reads(conn)
+
+    def queue_send(self, conn, data):
+        """Queue framed bytes for `conn`; the selector thread writes them. Safe from any thread."""
+        with self._send_lock:
+            if conn.closed:
+                return
+            conn.send_buf.append(data)
+            conn.queued += len(data)
+            if conn.queued > SEND_HIGH_WATER and conn not in self._congested:
+                conn.last_sent = time.monotonic()
+                self._congested.add(conn)
+            if conn.writing and conn.queued <= MAX_SEND_BACKLOG:
+                return
+            conn.writing = True
+            self._write_ready.append(conn)
+        if threading.get_ident() != self._io_thread_id:
+            try:
+                self._wake_w.send(b'\0')
+            except BlockingIOError:
+                pass  # a wakeup is already pending
+
+    def _drain_wake(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _arm_writers(self):
+        """Register connections with newly queued data for EVENT_WRITE."""
+        while self._write_ready:
+            conn = self._write_ready.popleft()
+            if conn.closed:
+                continue
+            if conn.queued > MAX_SEND_BACKLOG:
+                print(f"{conn.username} is not keeping up, dropping connection")
+                self.handle_disconnect(conn)
+                continue
+            self._update_events(conn, True)
+
+    def _update_events(self, conn, write):
+        """Register `conn` for reads (unless paused) and, if `write`, for writes."""
+        events = (selectors.EVENT_READ if conn.reading else 0) | (selectors.EVENT_WRITE if write else 0)
+        if events == conn.events:
+            return
+        if not events:
+            self.selector.unregister(conn.sock)
+        elif not conn.events:
+            self.selector.register(conn.sock, events, conn)
+        else:
+            self.selector.modify(conn.sock, events, conn)
+        conn.events = events
+
+    def _pause_reads(self, conn):
+        conn.reading = False
+        self._paused.append(conn)
+        self._update_events(conn, bool(conn.events & selectors.EVENT_WRITE))
+
+    def _resume_reads(self):
+        """Start reading every paused source again once no receiver is congested."""
+        paused, self._paused = self._paused, []
+        for conn in paused:
+            if not conn.closed:
+                conn.reading = True
+                self._update_events(conn, bool(conn.events & selectors.EVENT_WRITE))
+
+    def _drop_stalled(self):
+        """Disconnect congested clients that took no data for SEND_STALL_TIMEOUT."""
+        now = time.monotonic()
+        with self._send_lock:
+            stalled = [conn for conn in self._congested if now - conn.last_sent > SEND_STALL_TIMEOUT]
+        for conn in stalled:
+            print(f"{conn.username} stopped receiving, dropping connection")
+            self.handle_disconnect(conn)
+
+    def flush_client(self, conn):
+        """Write as much of the backlog as the socket takes, many frames per syscall."""
+        while True:
+            with self._send_lock:
+                if not conn.send_buf:
+                    conn.writing = False
+                    break
+                pending = list(itertools.islice(conn.send_buf, SEND_IOV_MAX))
+            try:
+                sent = conn.sock.sendmsg(pending) if HAS_SENDMSG else conn.sock.send(pending[0])
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                print(f"Failed to send to {conn.username}: {e}")
+                self.handle_disconnect(conn)
+                return
+            with self._send_lock:
+                conn.queued -= sent
+                if conn in self._congested:
+                    conn.last_sent = time.monotonic()
+                    if conn.queued < SEND_LOW_WATER:
+                        self._congested.discard(conn)
+                while sent:
+                    head = conn.send_buf[0]
+                    if sent < len(head):
+                        conn.send_buf[0] = memoryview(head)[sent:]
+                        return  # socket buffer is full, wait for the next EVENT_WRITE
+                    sent -= len(head)
+                    conn.send_buf.popleft()
+        self._update_events(conn, False)
 
     def handle_tcp_message(self, msg_type, payload, username):
-        if msg_type == MessageType.CHAT:
-            # Add username and broadcast
-            payload['user'] = username
-            self.broadcast_tcp(msg_type, payload)
+        handler = self._tcp_handlers.get(msg_type)
+        if handler:
+            handler(msg_type, payload, username)
+
+    def _handle_chat(self, msg_type, payload, username):
+        # Add username and broadcast
+        payload['user'] = username
+        self.broadcast_tcp(msg_type, payload)
+        if LOG_LEVEL >= 2:
             print(f"[CHAT] {username}: {payload.get('msg', '')}")
-            
-        elif msg_type == MessageType.UDP_REGISTER:
-            # Client sending their UDP port
-            udp_port = payload.get('port')
-            with self.clients_lock:
-                if username in self.clients:
-                    client_ip = self.clients[username]['tcp_addr'][0]
-                    self.clients[username]['udp_addr'] = (client_ip, udp_port)
+
+    def _handle_udp_register(self, msg_type, payload, username):
+        # Client sending their UDP port
+        udp_port = payload.get('port')
+        with self.clients_lock:
+            if username in self.clients:
+                client_ip = self.clients[username]['tcp_addr'][0]
+                self._forget_udp_addr(username)
+                self.clients[username]['udp_addr'] = (client_ip, udp_port)
+                # The outgoing header is constant per user apart from type and length,
+                # which the relay packs into it in place
+                name = username.encode()
+                relay_head = bytearray(_HDR.size) + _LEN.pack(len(name)) + name
+                self.udp_senders[(client_ip, udp_port)] = (username, relay_head)
+                self._rebuild_targets()
+                if LOG_LEVEL >= 1:
                     print(f"{username} registered UDP at {client_ip}:{udp_port}")
-                    
-        elif msg_type == MessageType.FILE_NOTIFY:
-            payload['user'] = username
-            self.broadcast_tcp(msg_type, payload, exclude_username=username)
-            print(f"[FILE] {username} sharing: {payload.get('filename')}")
-            
-        elif msg_type == MessageType.FILE_CHUNK:
-            # Relay file chunks
-            payload['user'] = username
-            self.broadcast_tcp(msg_type, payload, exclude_username=username)
-            
-        elif msg_type == MessageType.SCREEN_START:
-            payload['user'] = username
-            self.broadcast_tcp(msg_type, payload, exclude_username=username)
+
+    def _handle_file_notify(self, msg_type, payload, username):
+        self.broadcast_tcp(msg_type, stamp_user(payload, username), exclude_username=username)
+        if LOG_LEVEL >= 2:
+            print(f"[FILE] {username} is sharing a file")
+
+    def _handle_file_abort(self, msg_type, payload, username):
+        self.broadcast_tcp(msg_type, stamp_user(payload, username), exclude_username=username)
+        if LOG_LEVEL >= 2:
+            print(f"[FILE] {username} aborted a file transfer")
+
+    def _handle_file_chunk(self, msg_type, payload, username):
+        # Relay file chunks untouched (binary frame, sender is known from FILE_NOTIFY)
+        self.broadcast_tcp(msg_type, payload, exclude_username=username)
+
+    def _handle_screen_start(self, msg_type, payload, username):
+        self.broadcast_tcp(msg_type, stamp_user(payload, username), exclude_username=username)
+        if LOG_LEVEL >= 2:
             print(f"[SCREEN] {username} started screen share")
-            
-        elif msg_type == MessageType.SCREEN_IMAGE:
-            payload['user'] = username
-            self.broadcast_tcp(msg_type, payload, exclude_username=username)
-            
-        elif msg_type == MessageType.SCREEN_STOP:
-            payload['user'] = username
-            self.broadcast_tcp(msg_type, payload, exclude_username=username)
+
+    def _handle_screen_image(self, msg_type, payload, username):
+        # Raw encoded frame; splice the sender's name in front
+        name = username.encode()
+        self.broadcast_tcp(msg_type, _U16.pack(len(name)) + name + payload, exclude_username=username)
+
+    def _handle_screen_stop(self, msg_type, payload, username):
+        self.broadcast_tcp(msg_type, stamp_user(payload, username), exclude_username=username)
+        if LOG_LEVEL >= 2:
             print(f"[SCREEN] {username} stopped screen share")
 
     def handle_udp_packets(self):
+        # Per-datagram loop: bind everything it touches to locals once
+        recvfrom_into = self.udp_socket.recvfrom_into
+        recv_view, buf, mv = self._udp_recv_view, self._udp_buf, self._udp_mv
+        unpack_from, pack_into, hdr_size = _HDR.unpack_from, _HDR.pack_into, _HDR.size
+        find_sender = self.udp_senders.get
+        relay_udp = self.relay_udp
+        media_types = _MEDIA_TYPES
         while True:
             try:
-                data, addr = self.udp_socket.recvfrom(BUFFER_SIZE)
+                nbytes, addr = recvfrom_into(recv_view)
                 
-                if len(data) < 5:
+                if nbytes < 5:
                     continue
                 
-                msg_type = MessageType(data[0])
-                length = struct.unpack('!I', data[1:5])[0]
-                payload = data[5:5+length]
+                msg_type, length = unpack_from(buf, UDP_HEADROOM)
+                if msg_type not in media_types:
+                    continue
+                payload_start = UDP_HEADROOM + 5
+                end = UDP_HEADROOM + min(nbytes, 5 + length)
                 
                 # Find sender by UDP address
-                sender_username = None
-                with self.clients_lock:
-                    for username, info in self.clients.items():
-                        if info['udp_addr'] == addr:
-                            sender_username = username
-                            break
-                
-                if not sender_username:
+                sender = find_sender(addr)
+                if not sender:
                     continue
+                sender_username, head = sender
+                
+                # Broadcast to all other clients, adding username to payload for identification.
+                # The header is written over the headroom in front of the payload, so the
+                # datagram goes out as the one buffer it arrived in. Views are only valid
+                # until the next receive; relay_udp sends before returning.
+                pack_into(head, 0, msg_type, len(head) - hdr_size + end - payload_start)
+                start = payload_start - len(head)
+                if start >= 0:
+                    mv[start:payload_start] = head
+                    datagram = (mv[start:end],)
+                else:
+                    datagram = (head, mv[payload_start:end])  # name longer than the headroom
                 
-                # Broadcast to all other clients
-                if msg_type in (MessageType.VIDEO_STREAM, MessageType.AUDIO_STREAM):
-                    # Add username to payload for identification
-                    username_bytes = sender_username.encode()
-                    new_payload = struct.pack('!I', len(username_bytes)) + username_bytes + payload
-                    new_data = struct.pack('!BI', msg_type.value, len(new_payload)) + new_payload
-                    
-                    with self.clients_lock:
-                        for username, info in self.clients.items():
-                            if username != sender_username and info['udp_addr']:
-                                try:
-                                    self.udp_socket.sendto(new_data, info['udp_addr'])
-                                except Exception as e:
-                                    print(f"UDP send error to {username}: {e}")
+                # Re-read each time: _rebuild_targets swaps in a new list
+                targets = [addr for username, addr in self._udp_targets if username != sender_username]
+                if targets:
+                    relay_udp(datagram, targets)
                                     
             except Exception as e:
-                print(f"UDP error: {e}")
+                self._udp_error(f"UDP error: {e}")
 
-    def handle_disconnect(self, username):
+    def _forget_udp_addr(self, username):
+        """Drop `username`'s reverse-index entry; call with clients_lock held."""
+        addr = self.clients[username]['udp_addr']
+        sender = self.udp_senders.get(addr)
+        if sender and sender[0] == username:
+            del self.udp_senders[addr]
+
+    def _rebuild_targets(self):
+        """Refresh the broadcast lists; call with clients_lock held.
+
+        The lists are replaced, never mutated, so readers can iterate them without the lock.
+        """
+        self._tcp_targets = [(username, info['conn']) for username, info in self.clients.items()]
+        self._udp_targets = [(username, info['udp_addr']) for username, info in self.clients.items()
+                             if info['udp_addr']]
+
+    def relay_udp(self, chunks, targets):
+        """Send one datagram, given as one or more chunks, to every address in `targets`."""
+        if self._fanout:
+            try:
+                self._fanout.send(self.udp_socket.fileno(), chunks, targets)
+            except OSError as e:
+                self._udp_error(f"UDP send error: {e}")
+            return
+        data = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+        sendto = self.udp_socket.sendto
+        for addr in targets:
+            try:
+                sendto(data, addr)
+            except Exception as e:
+                self._udp_error(f"UDP send error to {addr}: {e}")
+
+    def _udp_error(self, message):
+        """Print a per-datagram error, at most once per UDP_ERROR_INTERVAL; a dead peer fails every packet."""
+        self._udp_errors += 1
+        now = time.monotonic()
+        if now - self._udp_error_at >= UDP_ERROR_INTERVAL:
+            suppressed = self._udp_errors - 1
+            print(message + (f" ({suppressed} similar errors suppressed)" if suppressed else ""))
+            self._udp_error_at = now
+            self._udp_errors = 0
+
+    def handle_disconnect(self, conn):
+        with self._send_lock:
+            if conn.closed:
+                return
+            conn.closed = True
+            conn.send_buf.clear()
+            self._congested.discard(conn)
+        try:
+            self.selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            conn.sock.close()
+        except:
+            pass
+        username = conn.username
         if username:
             with self.clients_lock:
-                if username in self.clients:
-                    try:
-                        self.clients[username]['tcp'].close()
-                    except:
-                        pass
+                if username in self.clients and self.clients[username]['conn'] is conn:
+                    self._forget_udp_addr(username)
                     del self.clients[username]
+                    self._rebuild_targets()
             
-            print(f"{username} disconnected")
+            if LOG_LEVEL >= 1:
+                print(f"{username} disconnected")
             self.broadcast_tcp(MessageType.USER_LEAVE, {"user": username})
 
     def broadcast_tcp(self, msg_type, payload, exclude_username=None):
         data = self.pack_message(msg_type, payload)
         
-        with self.clients_lock:
-            for username, info in list(self.clients.items()):
-                if username != exclude_username:
-                    try:
-                        info['tcp'].send(data)
-                    except Exception as e:
-                        print(f"Failed to send to {username}: {e}")
-
-    def pack_message(self, msg_type, payload):
-        payload_bytes = json.dumps(payload).encode()
-        length = len(payload_bytes)
-        return struct.pack('!BI', msg_type.value, length) + payload_bytes
+        # Queue only, from the lock-free target list; a slow client holds up no one
+        queue_send = self.queue_send
+        for username, conn in self._tcp_targets:
+            if username != exclude_username:
+                queue_send(conn, data)
+
+    def pack_message(self, msg_type, payload, _pack_hdr=_HDR.pack, _packb=_packb):
+        # Binary messages are forwarded as-is; everything else is a msgpack map
+        if isinstance(payload, bytes):
+            payload_bytes = payload
+        else:
+            payload_bytes = _packb(payload)
+        return _pack_hdr(msg_type.value, len(payload_bytes)) + payload_bytes
 
 if __name__ == "__main__":
     server = Server()